@@ -0,0 +1,36 @@
+import numpy as np
+
+# Criteria order used by the FRIZ pairwise table and the weight spin boxes
+CRITERIA = ("elevation", "slope", "proximity", "rainfall")
+
+# Saaty's random consistency index by matrix size
+RANDOM_INDEX = {1: 0.0, 2: 0.0, 3: 0.58, 4: 0.90, 5: 1.12,
+                6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45, 10: 1.49}
+
+
+def ahp_weights(matrix):
+    """
+    Weights from the principal eigenvector of a pairwise comparison matrix.
+    Returns (weights, CR) where CR is the consistency ratio.
+    """
+    A = np.asarray(matrix, dtype=float)
+    n = A.shape[0]
+    eigenvalues, eigenvectors = np.linalg.eig(A)
+    max_index = np.argmax(eigenvalues.real)
+    principal_eigenvector = eigenvectors[:, max_index].real
+    weights = principal_eigenvector / np.sum(principal_eigenvector)
+
+    # Calculate consistency ratio (CR)
+    lambda_max = eigenvalues[max_index].real
+    CI = (lambda_max - n) / (n - 1) if n > 1 else 0.0
+    RI = RANDOM_INDEX.get(n, 1.49)
+    CR = CI / RI if RI != 0 else 0.0
+    return weights, CR
+
+
+def batch_ahp_weights(matrices):
+    """Principal-eigenvector weights for a stack of (k, n, n) pairwise matrices."""
+    eigenvalues, eigenvectors = np.linalg.eig(np.asarray(matrices, dtype=float))
+    max_index = np.argmax(eigenvalues.real, axis=1)
+    principal = np.take_along_axis(eigenvectors.real, max_index[:, None, None], axis=2)[:, :, 0]
+    return principal / principal.sum(axis=1, keepdims=True)
@@ -0,0 +1,89 @@
+"""
+Lazy alignment of input rasters to a reference grid (usually the DEM).
+
+AlignedRaster opens a raster as-is when it already shares the reference
+grid, and otherwise through a rasterio WarpedVRT on that grid. Reads of any
+window are then resampled on demand for just that window, without a
+full-size pre-warped copy on disk. gdal_aligned_vrt() does the same for the
+GDAL-based scripts with an in-memory VRT from gdal.Warp.
+"""
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+
+
+def grid_matches(src, reference):
+    """True when src has the reference's size and transform (and CRS, when both have one)."""
+    same_crs = src.crs is None or reference.crs is None or src.crs == reference.crs
+    return (same_crs and (src.height, src.width) == (reference.height, reference.width)
+            and src.transform.almost_equals(reference.transform))
+
+
+class AlignedRaster:
+    """
+    A raster seen on the reference grid. Behaves like the rasterio dataset
+    it wraps (read, transform, height, ...); usable as a context manager.
+    Source nodata reads as NaN (float32) whether or not the raster had to be
+    warped, so a pixel's value never depends on the alignment path.
+    """
+
+    def __init__(self, path, reference, resampling="bilinear"):
+        self.src = rasterio.open(path)
+        self.warped = not grid_matches(self.src, reference)
+        if not self.warped:
+            self.dataset = self.src
+            return
+        print(f"Aligning {path} to the reference grid ({resampling} resampling)")
+        self.dataset = WarpedVRT(
+            self.src,
+            # Without a CRS on one side, assume both are in the reference's CRS
+            src_crs=self.src.crs or reference.crs,
+            crs=reference.crs or self.src.crs,
+            transform=reference.transform,
+            width=reference.width,
+            height=reference.height,
+            resampling=Resampling[resampling],
+            src_nodata=self.src.nodata,
+            nodata=np.nan,
+            dtype="float32")
+
+    def read(self, indexes=None, **kwargs):
+        data = self.dataset.read(indexes, **kwargs)
+        nodata = self.src.nodata
+        if self.warped or nodata is None or np.isnan(nodata) or kwargs.get("masked"):
+            return data
+        data = data.astype(np.float32)
+        data[data == np.float32(nodata)] = np.nan
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.dataset, name)
+
+    def close(self):
+        if self.warped:
+            self.dataset.close()
+        self.src.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def gdal_aligned_vrt(path, reference_ds, resample_alg="bilinear"):
+    """
+    GDAL dataset of path warped onto reference_ds's grid as an in-memory VRT;
+    pixels are only resampled when read.
+    """
+    from osgeo import gdal
+
+    gt = reference_ds.GetGeoTransform()
+    width, height = reference_ds.RasterXSize, reference_ds.RasterYSize
+    bounds = (gt[0], gt[3] + height * gt[5], gt[0] + width * gt[1], gt[3])
+    options = {"format": "VRT", "outputBounds": bounds, "width": width, "height": height,
+               "resampleAlg": resample_alg, "dstNodata": np.nan, "outputType": gdal.GDT_Float32}
+    if reference_ds.GetProjection():
+        options["dstSRS"] = reference_ds.GetProjection()
+    return gdal.Warp("", path, **options)
@@ -0,0 +1,62 @@
+import numpy as np
+
+# Elements handled per searchsorted call; bounds the intp index temporary
+CHUNK_SIZE = 1 << 20
+
+
+def class_edges(breaks, dtype, right=False, exact=False):
+    """
+    Turns breaks into edges for a side='right' searchsorted, in the data's
+    dtype so comparisons match `data < break` on that dtype. A right-closed
+    break keeps values equal to it in the lower class, which is the same as
+    an ordinary break at the next representable number above it. With exact,
+    each edge is instead the first value of dtype that lies in the upper
+    class when compared with the break at full (float64) precision, so
+    float32 data lands in the same classes as it would as float64.
+    """
+    right = np.broadcast_to(np.asarray(right, dtype=bool), np.shape(breaks))
+    if exact:
+        full = np.asarray(breaks, dtype=float)
+        edges = full.astype(dtype)
+        below = np.where(right, edges <= full, edges < full)
+        edges = np.where(below, np.nextafter(edges, dtype.type(np.inf)), edges)
+    else:
+        breaks = np.asarray(breaks, dtype=dtype)
+        edges = np.where(right, np.nextafter(breaks, dtype.type(np.inf)), breaks)
+    if np.any(np.diff(edges) < 0):
+        raise ValueError(f"Class breaks must be in increasing order, got {np.asarray(breaks).tolist()}")
+    return edges
+
+
+def classify(array, breaks, labels, nodata_code, right=False, out=None, exact=False):
+    """
+    Bins `array` into len(breaks) + 1 classes and writes labels[i] for class i
+    into a uint8 map in a single pass. As with np.digitize, right=False puts a
+    value equal to a break in the class above it and right=True in the class
+    below; pass a sequence to choose per break. NaN becomes nodata_code.
+    exact=True compares float32 data with the breaks at full precision (see
+    class_edges).
+
+    `out` may be a preallocated C-contiguous uint8 array of the same shape.
+    """
+    array = np.asarray(array)
+    if len(labels) != len(breaks) + 1:
+        raise ValueError(f"Need {len(breaks) + 1} labels for {len(breaks)} breaks, got {len(labels)}")
+    dtype = array.dtype if array.dtype.kind == 'f' else np.dtype(float)
+    edges = class_edges(breaks, dtype, right, exact)
+    lut = np.append(np.asarray(labels, dtype=np.uint8), np.uint8(nodata_code))
+
+    if out is None:
+        out = np.empty(array.shape, dtype=np.uint8)
+    elif out.shape != array.shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+        raise ValueError("out must be a C-contiguous uint8 array shaped like the input")
+
+    values = array.reshape(-1)
+    classes = out.reshape(-1)
+    for start in range(0, values.size, CHUNK_SIZE):
+        chunk = values[start:start + CHUNK_SIZE]
+        index = np.searchsorted(edges, chunk, side='right')
+        if array.dtype.kind == 'f':
+            index[np.isnan(chunk)] = len(lut) - 1
+        np.take(lut, index, out=classes[start:start + CHUNK_SIZE])
+    return out
@@ -1,59 +1,201 @@
+import os
 import sys
 import numpy as np
 import matplotlib.pyplot as plt
-from osgeo import gdal
-
-
-def clip_rainfall_to_dem(dem_path, rainfall_path):
-    print(f"Opening DEM file: {dem_path}")
-    dem_ds = gdal.Open(dem_path)
-    if dem_ds is None:
-        raise FileNotFoundError(f"DEM file not found: {dem_path}")
-
-    dem_raster_data = dem_ds.ReadAsArray().astype(float)
-    dem_nodata = dem_ds.GetRasterBand(1).GetNoDataValue()
-    print(f"DEM NoData value: {dem_nodata}")
-    if dem_nodata is not None:
-        dem_raster_data[dem_raster_data == dem_nodata] = np.nan
-
-    print(f"Opening Rainfall file: {rainfall_path}")
-    rainfall_ds = gdal.Open(rainfall_path)
-    if rainfall_ds is None:
-        raise FileNotFoundError(f"Rainfall file not found: {rainfall_path}")
-
-    rainfall_raster_data = rainfall_ds.ReadAsArray().astype(float)
-    if dem_raster_data.shape != rainfall_raster_data.shape:
-        raise ValueError("DEM and Rainfall rasters must have the same dimensions.")
-
-    print("Clipping rainfall data using DEM's valid region...")
-    rainfall_clipped = np.where(np.isnan(dem_raster_data), np.nan, rainfall_raster_data)
-
-    geotransform = dem_ds.GetGeoTransform()
-    projection = dem_ds.GetProjection()
-
-    dem_ds = None
-    rainfall_ds = None
-
-    print("Clipping complete.")
-    return rainfall_clipped, geotransform, projection
+from osgeo import gdal, ogr, osr
+from align import gdal_aligned_vrt
+from cog import gdal_write_cog
+
+VECTOR_EXTENSIONS = (".shp", ".geojson", ".json", ".gpkg", ".kml")
+
+
+def gis_order(srs):
+    """Keeps x=lon, y=lat for geographic SRS under GDAL 3's axis-order rules."""
+    if hasattr(srs, "SetAxisMappingStrategy"):
+        srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    return srs
+
+
+def load_boundary(vector_path, target_wkt, where=None):
+    """Union of a layer's polygons (optionally filtered), in the target raster's SRS."""
+    vector_ds = ogr.Open(vector_path)
+    if vector_ds is None:
+        raise FileNotFoundError(f"Boundary file not found: {vector_path}")
+    layer = vector_ds.GetLayer()
+    if where:
+        layer.SetAttributeFilter(where)
+
+    transform = None
+    source_srs = layer.GetSpatialRef()
+    if source_srs is not None and target_wkt:
+        target_srs = gis_order(osr.SpatialReference(wkt=target_wkt))
+        if not gis_order(source_srs.Clone()).IsSame(target_srs):
+            transform = osr.CoordinateTransformation(gis_order(source_srs.Clone()), target_srs)
+
+    boundary = None
+    for feature in layer:
+        geometry = feature.GetGeometryRef()
+        if geometry is None:
+            continue
+        geometry = geometry.Clone()
+        if transform is not None:
+            geometry.Transform(transform)
+        boundary = geometry if boundary is None else boundary.Union(geometry)
+    if boundary is None:
+        raise ValueError(f"No polygons selected in {vector_path}" + (f" with '{where}'" if where else ""))
+    return boundary
+
+
+def raster_footprint(raster_path, target_wkt):
+    """The raster's extent as a polygon in the target SRS."""
+    ds = gdal.Open(raster_path)
+    if ds is None:
+        raise FileNotFoundError(f"Extent raster not found: {raster_path}")
+    gt = ds.GetGeoTransform()
+    xmin, ymax = gt[0], gt[3]
+    xmax, ymin = xmin + ds.RasterXSize * gt[1], ymax + ds.RasterYSize * gt[5]
+    ring = ogr.Geometry(ogr.wkbLinearRing)
+    for x, y in ((xmin, ymax), (xmax, ymax), (xmax, ymin), (xmin, ymin), (xmin, ymax)):
+        ring.AddPoint_2D(x, y)
+    footprint = ogr.Geometry(ogr.wkbPolygon)
+    footprint.AddGeometry(ring)
+
+    source_wkt = ds.GetProjection()
+    if source_wkt and target_wkt:
+        source_srs = gis_order(osr.SpatialReference(wkt=source_wkt))
+        target_srs = gis_order(osr.SpatialReference(wkt=target_wkt))
+        if not source_srs.IsSame(target_srs):
+            footprint.Transform(osr.CoordinateTransformation(source_srs, target_srs))
+    return footprint
+
+
+def envelope_window(geotransform, width, height, envelope):
+    """
+    (xoff, yoff, xsize, ysize) of the pixels covering an OGR envelope
+    (minx, maxx, miny, maxy), clipped to the raster. North-up rasters only.
+    """
+    minx, maxx, miny, maxy = envelope
+    # Round first so an envelope lying on pixel edges doesn't pick up an extra pixel
+    col_start = int(np.floor(round((minx - geotransform[0]) / geotransform[1], 6)))
+    col_stop = int(np.ceil(round((maxx - geotransform[0]) / geotransform[1], 6)))
+    row_start = int(np.floor(round((maxy - geotransform[3]) / geotransform[5], 6)))
+    row_stop = int(np.ceil(round((miny - geotransform[3]) / geotransform[5], 6)))
+    col_start, row_start = max(col_start, 0), max(row_start, 0)
+    col_stop, row_stop = min(col_stop, width), min(row_stop, height)
+    if col_stop <= col_start or row_stop <= row_start:
+        raise ValueError("The boundary does not overlap the raster.")
+    return col_start, row_start, col_stop - col_start, row_stop - row_start
+
+
+def rasterize_mask(geometry, geotransform, projection, xsize, ysize, all_touched=False):
+    """Boolean (ysize, xsize) mask of the pixels inside geometry."""
+    mask_ds = gdal.GetDriverByName("MEM").Create("", xsize, ysize, 1, gdal.GDT_Byte)
+    mask_ds.SetGeoTransform(geotransform)
+    mask_ds.SetProjection(projection)
+
+    vector_ds = ogr.GetDriverByName("Memory").CreateDataSource("")
+    layer = vector_ds.CreateLayer("boundary", srs=osr.SpatialReference(wkt=projection) if projection else None)
+    feature = ogr.Feature(layer.GetLayerDefn())
+    feature.SetGeometry(geometry)
+    layer.CreateFeature(feature)
+
+    options = ["ALL_TOUCHED=TRUE"] if all_touched else []
+    gdal.RasterizeLayer(mask_ds, [1], layer, burn_values=[1], options=options)
+    return mask_ds.ReadAsArray().astype(bool)
+
+
+def clip_to_geometry(raster_path, geometry, all_touched=False):
+    """
+    Reads only the pixel window around geometry and masks pixels outside it
+    (and the raster's nodata) to NaN. Returns (float32 array, cropped
+    geotransform, projection).
+    """
+    ds = gdal.Open(raster_path)
+    if ds is None:
+        raise FileNotFoundError(f"Raster file not found: {raster_path}")
+    geotransform = ds.GetGeoTransform()
+    projection = ds.GetProjection()
+    if geotransform[2] != 0 or geotransform[4] != 0:
+        raise ValueError("Rotated rasters are not supported for polygon clipping.")
+
+    xoff, yoff, xsize, ysize = envelope_window(geotransform, ds.RasterXSize, ds.RasterYSize,
+                                               geometry.GetEnvelope())
+    print(f"Reading a {xsize}x{ysize} window of the {ds.RasterXSize}x{ds.RasterYSize} raster")
+    band = ds.GetRasterBand(1)
+    data = band.ReadAsArray(xoff, yoff, xsize, ysize).astype(np.float32)
+    nodata = band.GetNoDataValue()
+    if nodata is not None:
+        data[data == nodata] = np.nan
+
+    cropped_geotransform = (geotransform[0] + xoff * geotransform[1], geotransform[1], 0.0,
+                            geotransform[3] + yoff * geotransform[5], 0.0, geotransform[5])
+    inside = rasterize_mask(geometry, cropped_geotransform, projection, xsize, ysize, all_touched)
+    data[~inside] = np.nan
+    return data, cropped_geotransform, projection
+
+
+def clip_to_boundary(raster_path, vector_path, where=None, all_touched=False):
+    """Crops and masks a raster to the polygons of a boundary file (e.g. punesubdis.shp)."""
+    ds = gdal.Open(raster_path)
+    if ds is None:
+        raise FileNotFoundError(f"Raster file not found: {raster_path}")
+    boundary = load_boundary(vector_path, ds.GetProjection(), where)
+    return clip_to_geometry(raster_path, boundary, all_touched)
+
+
+def shares_grid(ds, extent_ds):
+    """True when both rasters have the same SRS and pixel size and their pixel edges line up."""
+    gt, extent_gt = ds.GetGeoTransform(), extent_ds.GetGeoTransform()
+    if ds.GetProjection() and extent_ds.GetProjection():
+        srs = gis_order(osr.SpatialReference(wkt=ds.GetProjection()))
+        if not srs.IsSame(gis_order(osr.SpatialReference(wkt=extent_ds.GetProjection()))):
+            return False
+    col_shift = (gt[0] - extent_gt[0]) / extent_gt[1]
+    row_shift = (gt[3] - extent_gt[3]) / extent_gt[5]
+    return (np.allclose(extent_gt[1:], gt[1:])
+            and abs(col_shift - round(col_shift)) < 1e-6 and abs(row_shift - round(row_shift)) < 1e-6)
+
+
+def clip_to_raster_footprint(raster_path, extent_raster_path, resample_alg="bilinear"):
+    """
+    Crops a raster to another raster's footprint and sets the pixels where
+    the extent raster is nodata (or NaN) to NaN. A raster on a different
+    grid is read through a VRT warped onto the extent raster's grid.
+    """
+    ds = gdal.Open(raster_path)
+    if ds is None:
+        raise FileNotFoundError(f"Raster file not found: {raster_path}")
+    extent_ds = gdal.Open(extent_raster_path)
+    if extent_ds is None:
+        raise FileNotFoundError(f"Extent raster not found: {extent_raster_path}")
+    extent_gt = extent_ds.GetGeoTransform()
+
+    if shares_grid(ds, extent_ds):
+        data, geotransform, projection = clip_to_geometry(
+            raster_path, raster_footprint(extent_raster_path, ds.GetProjection()))
+    else:
+        print("Rasters are on different grids; resampling onto the extent raster's grid...")
+        aligned = gdal_aligned_vrt(raster_path, extent_ds, resample_alg)
+        data = aligned.GetRasterBand(1).ReadAsArray().astype(np.float32)
+        geotransform, projection = extent_gt, extent_ds.GetProjection()
+
+    # Mask the extent raster's nodata over the cropped window
+    xoff = int(round((geotransform[0] - extent_gt[0]) / extent_gt[1]))
+    yoff = int(round((geotransform[3] - extent_gt[3]) / extent_gt[5]))
+    rows, cols = data.shape
+    extent_band = extent_ds.GetRasterBand(1)
+    extent_nodata = extent_band.GetNoDataValue()
+    if extent_nodata is not None:
+        extent = extent_band.ReadAsArray(xoff, yoff, cols, rows).astype(np.float32)
+        # NaN never equals itself, so a NaN nodata (and any NaN pixel) needs isnan
+        data[np.isnan(extent) | (extent == np.float32(extent_nodata))] = np.nan
+    return data, geotransform, projection
 
 
 def save_raster(output_path, array, geotransform, projection, nodata_val=-1):
     print(f"Saving raster to: {output_path}")
-    driver = gdal.GetDriverByName("GTiff")
-    rows, cols = array.shape
-    out_ds = driver.Create(output_path, cols, rows, 1, gdal.GDT_Float32)
-    if out_ds is None:
-        raise RuntimeError(f"Failed to create output raster: {output_path}")
-
-    out_ds.SetGeoTransform(geotransform)
-    out_ds.SetProjection(projection)
-
-    out_band = out_ds.GetRasterBand(1)
-    out_band.WriteArray(array)
-    out_band.SetNoDataValue(nodata_val)
-    out_band.FlushCache()
-    out_ds = None
+    gdal_write_cog(output_path, array, geotransform, projection, nodata_val, gdal.GDT_Float32,
+                   resampling="average")
 
     print("Raster saved successfully.")
     return output_path
@@ -70,18 +212,27 @@ def display_raster(array, title="Raster Data"):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 5:
-        print("Usage: python clipping.py <input_raster> <extent_raster> <nodata_value> <output_raster>")
+    if len(sys.argv) < 5:
+        print("Usage: python clipping.py <input_raster> <extent_raster|boundary.shp> <nodata_value> <output_raster>"
+              " [--where \"TEHSIL = 'Haveli'\"] [--all-touched]")
         sys.exit(1)
 
     input_raster_path = sys.argv[1]
     extent_raster_path = sys.argv[2]
     nodata_value = float(sys.argv[3])
     output_raster_path = sys.argv[4]
+    options = sys.argv[5:]
+    where = options[options.index("--where") + 1] if "--where" in options else None
+    all_touched = "--all-touched" in options
 
     try:
         print("Starting clipping process...")
-        clipped_array, geo, proj = clip_rainfall_to_dem(extent_raster_path, input_raster_path)
+        if os.path.splitext(extent_raster_path)[1].lower() in VECTOR_EXTENSIONS:
+            # Crop to the boundary's window and mask outside its polygons
+            clipped_array, geo, proj = clip_to_boundary(input_raster_path, extent_raster_path, where, all_touched)
+        else:
+            # Crop to the extent raster's footprint, masking its nodata where the grids match
+            clipped_array, geo, proj = clip_to_raster_footprint(input_raster_path, extent_raster_path)
 
         # Replace NaNs with the user-defined NoData value
         clipped_array_filled = np.where(np.isnan(clipped_array), nodata_value, clipped_array)
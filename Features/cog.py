@@ -0,0 +1,111 @@
+"""
+Cloud-Optimized GeoTIFF output shared by the writers in this repo.
+
+Rasters are written as 512x512 tiles, DEFLATE (or ZSTD) compressed with a
+predictor, with internal overviews and nodata/CRS set. Writers that stream
+windows write into a tiled, compressed GTiff next to the destination; GDAL's
+COG driver then lays it out with overviews in one copy.
+
+    with cog_writer(path, resampling="nearest", **meta) as dst:
+        dst.write(block, 1, window=window)
+"""
+import os
+from contextlib import contextmanager
+import numpy as np
+import rasterio
+import rasterio.shutil
+
+COG_BLOCKSIZE = 512
+DEFAULT_COMPRESS = "deflate"
+
+
+def cog_options(compress=DEFAULT_COMPRESS, resampling="nearest"):
+    """Creation options for GDAL's COG driver."""
+    return {"COMPRESS": compress.upper(), "PREDICTOR": "YES", "BLOCKSIZE": str(COG_BLOCKSIZE),
+            "OVERVIEWS": "AUTO", "RESAMPLING": resampling.upper(), "BIGTIFF": "IF_SAFER"}
+
+
+def tiled_profile(meta, compress=DEFAULT_COMPRESS):
+    """meta as an internally tiled, compressed GTiff profile."""
+    profile = dict(meta, driver="GTiff", tiled=True, blockxsize=COG_BLOCKSIZE, blockysize=COG_BLOCKSIZE,
+                   compress=compress, BIGTIFF="IF_SAFER")
+    profile["predictor"] = 3 if np.issubdtype(np.dtype(meta["dtype"]), np.floating) else 2
+    return profile
+
+
+@contextmanager
+def cog_writer(path, compress=DEFAULT_COMPRESS, resampling="nearest", **meta):
+    """
+    Yields a writable rasterio dataset for meta (driver is ignored) and turns
+    it into a COG at path when the block exits. Use nearest overviews for
+    class maps and average for continuous surfaces.
+    """
+    staging = f"{path}.tmp.tif"
+    try:
+        with rasterio.open(staging, "w", **tiled_profile(meta, compress)) as dst:
+            yield dst
+        rasterio.shutil.copy(staging, path, driver="COG", **cog_options(compress, resampling))
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+def write_cog(path, array, compress=DEFAULT_COMPRESS, resampling="nearest", **meta):
+    """Writes a 2-D (one band) or 3-D (bands first) array as a COG."""
+    bands = array[None] if array.ndim == 2 else array
+    meta = dict(meta, count=bands.shape[0], height=bands.shape[1], width=bands.shape[2])
+    with cog_writer(path, compress, resampling, **meta) as dst:
+        dst.write(bands)
+
+
+def gdal_cog_copy(src_ds, path, compress=DEFAULT_COMPRESS, resampling="nearest"):
+    """Copies an open GDAL dataset to path as a COG."""
+    from osgeo import gdal
+
+    options = [f"{key}={value}" for key, value in cog_options(compress, resampling).items()]
+    out_ds = gdal.GetDriverByName("COG").CreateCopy(path, src_ds, options=options)
+    if out_ds is None:
+        raise RuntimeError(f"Failed to create output raster: {path}")
+    out_ds = None
+
+
+@contextmanager
+def gdal_cog_writer(path, width, height, count, gdal_type, compress=DEFAULT_COMPRESS, resampling="nearest"):
+    """
+    GDAL counterpart of cog_writer: yields a tiled, compressed GTiff dataset
+    to set up and write into, copied to a COG at path when the block exits.
+    """
+    from osgeo import gdal
+
+    staging = f"{path}.tmp.tif"
+    options = ["TILED=YES", f"BLOCKXSIZE={COG_BLOCKSIZE}", f"BLOCKYSIZE={COG_BLOCKSIZE}",
+               f"COMPRESS={compress.upper()}", "BIGTIFF=IF_SAFER"]
+    try:
+        staging_ds = gdal.GetDriverByName("GTiff").Create(staging, width, height, count, gdal_type, options=options)
+        if staging_ds is None:
+            raise RuntimeError(f"Failed to create output raster: {path}")
+        yield staging_ds
+        staging_ds.FlushCache()
+        gdal_cog_copy(staging_ds, path, compress, resampling)
+    finally:
+        # Close the staging file before removing it
+        staging_ds = None
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+def gdal_write_cog(path, array, geotransform, projection, nodata=None, gdal_type=None,
+                   compress=DEFAULT_COMPRESS, resampling="nearest"):
+    """Writes a 2-D array with GDAL georeferencing (geotransform tuple, WKT) as a COG."""
+    from osgeo import gdal
+
+    rows, cols = array.shape
+    mem_ds = gdal.GetDriverByName("MEM").Create("", cols, rows, 1, gdal_type or gdal.GDT_Float32)
+    mem_ds.SetGeoTransform(geotransform)
+    if projection:
+        mem_ds.SetProjection(projection)
+    band = mem_ds.GetRasterBand(1)
+    band.WriteArray(array)
+    if nodata is not None:
+        band.SetNoDataValue(nodata)
+    gdal_cog_copy(mem_ds, path, compress, resampling)
@@ -1,107 +1,158 @@
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-from osgeo import gdal
+from osgeo import gdal, osr
+from affine import Affine
+from cog import gdal_cog_writer
+from lulc_codes import ColorCodes, ColorHistogram, pack_rgb, sidecar_path, write_color_table
+from lulc_catalog import build_catalog, catalog_path
+from terrain import pixel_sizes
 
-def assign_integers_to_unique_colors_and_create_new_raster(lulc_file, output_file):
+# Nodata of the encoded raster: all bits set, which the UInt32 bands never hold
+# (this is the -1 that was written before, which GDAL cannot store as UInt32)
+ENCODED_NODATA = np.iinfo(np.uint32).max
+
+
+def read_rgb_strip(dataset, row, rows):
+    """The first three bands for a strip of rows, with nodata set to 0."""
+    bands = []
+    for i in range(1, 4):  # First 3 bands for RGB
+        band = dataset.GetRasterBand(i)
+        band_data = band.ReadAsArray(0, row, dataset.RasterXSize, rows)
+        nodata = band.GetNoDataValue()
+        if nodata is not None:
+            band_data[band_data == nodata] = 0
+        bands.append(band_data)
+    return bands
+
+
+def assign_integers_to_unique_colors_and_create_new_raster(lulc_file, output_file, rows_per_strip=1024):
+    """
+    Writes the RGB bands plus a 4th band with an integer per colour, numbered
+    in first-seen (row-major) order, and a <output>_colors.json colour table.
+    The raster is read in strips twice: once to number the colours, once to
+    write. Returns the {(r, g, b): id} table and the total pixel count.
+    """
     # Open the LULC raster file with GDAL
     dataset = gdal.Open(lulc_file)
     if dataset is None:
         raise ValueError("Could not open the LULC file.")
-    
+
     # Get the number of bands in the dataset
     num_bands = dataset.RasterCount
     if num_bands < 3:
         raise ValueError("The file doesn't have enough bands to form an RGB image.")
-    
-    # Read the bands into separate channels (assuming the first 3 bands are RGB)
-    bands = []
-    for i in range(1, 4):  # First 3 bands for RGB
-        band = dataset.GetRasterBand(i)
-        band_data = band.ReadAsArray()
-        nodata = band.GetNoDataValue()
-        if nodata is not None:
-            band_data[band_data == nodata] = 0
-        bands.append(band_data)
-    
-    # Stack the RGB channels to create a color image
-    rgb_image = np.dstack(bands)
-    
-    # Flatten the RGB image to a 2D array of pixels (each row is [R, G, B])
-    flattened_pixels = rgb_image.reshape(-1, 3)
-    
-    # Create a dictionary to store unique colors and their assigned integers
-    unique_colors = {}
-    color_id = 0
-    
-    # Assign integers to each unique color
-    for pixel in flattened_pixels:
-        pixel_tuple = tuple(pixel)
-        if pixel_tuple not in unique_colors:
-            unique_colors[pixel_tuple] = color_id
-            color_id += 1
-    
-    # Create a new raster to store the integer values
-    driver = gdal.GetDriverByName('GTiff')
-    if driver is None:
-        raise ValueError("GDAL driver for GTiff not available.")
-    
-    # Create a new dataset with the same dimensions and georeference as the original
-    new_dataset = driver.Create(output_file, dataset.RasterXSize, dataset.RasterYSize, 4, gdal.GDT_UInt32)
-    new_dataset.SetGeoTransform(dataset.GetGeoTransform())
-    new_dataset.SetProjection(dataset.GetProjection())
-    
-    # Write the original RGB channels to the first 3 bands
-    for i in range(3):
-        new_band = new_dataset.GetRasterBand(i + 1)
-        new_band.WriteArray(bands[i])
-        new_band.SetNoDataValue(-1)
-    
-    # Create an array of integers to store in the fourth band
-    integer_image = np.zeros_like(rgb_image[..., 0], dtype=np.uint32)  # Initialize with zeros
-    
-    # Assign the corresponding integer values to the integer_image
-    for i, pixel in enumerate(flattened_pixels):
-        color_tuple = tuple(pixel)
-        integer_image.reshape(-1)[i] = unique_colors[color_tuple]
-    
-    # Write the integer values to the fourth band
-    new_band = new_dataset.GetRasterBand(4)
-    new_band.WriteArray(integer_image)
-    new_band.SetNoDataValue(-1)
-    
-    # Save the changes and close the dataset
-    new_dataset.FlushCache()
-    
-    # Close the datasets
+
+    width, height = dataset.RasterXSize, dataset.RasterYSize
+    strips = [(row, min(rows_per_strip, height - row)) for row in range(0, height, rows_per_strip)]
+
+    # First pass: number the colours in the order they first appear
+    codes = ColorCodes()
+    for row, rows in strips:
+        codes.update(pack_rgb(*read_rgb_strip(dataset, row, rows)))
+
+    # Second pass: write the original RGB channels and their integer ids to a
+    # COG with the same dimensions and georeference as the original
+    with gdal_cog_writer(output_file, width, height, 4, gdal.GDT_UInt32) as new_dataset:
+        new_dataset.SetGeoTransform(dataset.GetGeoTransform())
+        new_dataset.SetProjection(dataset.GetProjection())
+        for i in range(4):
+            new_dataset.GetRasterBand(i + 1).SetNoDataValue(ENCODED_NODATA)
+
+        for row, rows in strips:
+            bands = read_rgb_strip(dataset, row, rows)
+            for i in range(3):
+                new_dataset.GetRasterBand(i + 1).WriteArray(bands[i], 0, row)
+            new_dataset.GetRasterBand(4).WriteArray(codes.encode(pack_rgb(*bands)), 0, row)
+
+    # Close the input dataset
     dataset = None
-    new_dataset = None
-    
-    # Return the dictionary of unique colors and the total pixels
-    total_pixels = flattened_pixels.shape[0]  # Total number of pixels
-    return unique_colors, total_pixels, rgb_image, integer_image
-
-# Path to your LULC raster file and output file
-lulc_file = 'data/PuneLuLc.tif'
-output_file = 'data/PuneLuLc_with_integers.tif'
-
-# Call the function to assign integers to the unique colors and create a new raster
-unique_colors, total_pixels, rgb_image, integer_image = assign_integers_to_unique_colors_and_create_new_raster(lulc_file, output_file)
-
-# Print the total number of unique colors and pixels
-print(f"Total unique colors: {len(unique_colors)}")
-print(f"Total number of pixels: {total_pixels}")
-print("Sample of assigned integers for colors:")
-for color, color_id in list(unique_colors.items())[:10]:  # Display the first 10 unique colors
-    print(f"Color {color}: {color_id}")
-
-# Display the LULC image (original colors)
-plt.imshow(rgb_image)
-plt.title("LULC Image")
-plt.axis('off')  # Hide axes
-plt.show()
-
-# Display the new integer values image (just for visualization)
-plt.imshow(integer_image, cmap='viridis')
-plt.title("Integer Values Image")
-plt.axis('off')  # Hide axes
-plt.show()
+
+    unique_colors = codes.color_table()
+    write_color_table(sidecar_path(output_file), unique_colors)
+    return unique_colors, width * height
+
+
+def strip_rows(dataset, target_rows=1024):
+    """Rows per strip: a whole number of the first band's blocks, near target_rows."""
+    block_rows = dataset.GetRasterBand(1).GetBlockSize()[1]
+    return max(block_rows, target_rows // block_rows * block_rows)
+
+
+def color_histogram(lulc_file):
+    """
+    True pixel count and area (hectares) per RGB colour, streamed in strips
+    of whole blocks. Pixel areas come from the geotransform, per row for
+    lat/lon rasters. Returns [((r, g, b), pixels, hectares)], most frequent first.
+    """
+    dataset = gdal.Open(lulc_file)
+    if dataset is None:
+        raise ValueError("Could not open the LULC file.")
+    if dataset.RasterCount < 3:
+        raise ValueError("The file doesn't have enough bands to form an RGB image.")
+
+    transform = Affine.from_gdal(*dataset.GetGeoTransform())
+    geographic = bool(osr.SpatialReference(wkt=dataset.GetProjection()).IsGeographic())
+    rows_per_strip = strip_rows(dataset)
+
+    histogram = ColorHistogram()
+    for row in range(0, dataset.RasterYSize, rows_per_strip):
+        rows = min(rows_per_strip, dataset.RasterYSize - row)
+        dx, dy = pixel_sizes(transform, geographic, row, rows)
+        histogram.update(pack_rgb(*read_rgb_strip(dataset, row, rows)), dx * dy / 10000)
+    return histogram.table()
+
+
+def read_preview(raster_path, max_size=2000):
+    """RGB image and integer band, decimated so the longer side is at most max_size."""
+    dataset = gdal.Open(raster_path)
+    scale = max(dataset.RasterXSize, dataset.RasterYSize) / max_size
+    buf_x, buf_y = dataset.RasterXSize, dataset.RasterYSize
+    if scale > 1:
+        buf_x, buf_y = int(buf_x / scale), int(buf_y / scale)
+    data = dataset.ReadAsArray(buf_xsize=buf_x, buf_ysize=buf_y)
+    return np.dstack(data[:3]).clip(0, 255).astype(np.uint8), data[3]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "histogram":
+        # python color_counter.py histogram <lulc_raster>
+        table = color_histogram(sys.argv[2])
+        print(f"{'Colour':>16} {'Pixels':>12} {'Hectares':>12}")
+        for color, pixels, hectares in table:
+            print(f"{str(color):>16} {pixels:>12} {hectares:>12.2f}")
+        print(f"{len(table)} colours, {sum(t[1] for t in table)} pixels, {sum(t[2] for t in table):.2f} ha")
+        sys.exit(0)
+
+    # Path to your LULC raster file and output file
+    lulc_file = 'data/PuneLuLc.tif'
+    output_file = 'data/PuneLuLc_with_integers.tif'
+
+    # Call the function to assign integers to the unique colors and create a new raster
+    unique_colors, total_pixels = assign_integers_to_unique_colors_and_create_new_raster(lulc_file, output_file)
+
+    # Print the total number of unique colors and pixels
+    print(f"Total unique colors: {len(unique_colors)}")
+    print(f"Total number of pixels: {total_pixels}")
+    print(f"Colour table saved as {sidecar_path(output_file)}")
+
+    # Index the new raster once so colour/id/count lookups don't rescan it
+    build_catalog(output_file, id_band=4)
+    print(f"Class catalogue saved as {catalog_path(output_file)}")
+    print("Sample of assigned integers for colors:")
+    for color, color_id in list(unique_colors.items())[:10]:  # Display the first 10 unique colors
+        print(f"Color {color}: {color_id}")
+
+    rgb_image, integer_image = read_preview(output_file)
+
+    # Display the LULC image (original colors)
+    plt.imshow(rgb_image)
+    plt.title("LULC Image")
+    plt.axis('off')  # Hide axes
+    plt.show()
+
+    # Display the new integer values image (just for visualization)
+    plt.imshow(integer_image, cmap='viridis')
+    plt.title("Integer Values Image")
+    plt.axis('off')  # Hide axes
+    plt.show()
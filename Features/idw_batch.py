@@ -0,0 +1,163 @@
+"""
+Batch IDW interpolation of many rainfall time steps.
+
+Station positions never change between time steps, so the IDW weights of
+every pixel are the same for all of them. They are built once as a sparse
+(pixels x stations) matrix, cached as .npz, and each strip of output rows is
+then a single sparse product with the (stations x T) rainfall matrix. The
+result is a T-band float32 GeoTIFF on the reference raster's grid.
+
+The series CSV has a station key column followed by one column per time
+step, e.g. the TEHSIL column of rainfall_data.csv against the stations'
+Taluka field:
+
+    TEHSIL,2024-07-01,2024-07-02,...
+
+Usage: python idw_batch.py <stations_shapefile> <series_csv> <reference_raster> <output_tif>
+           [--key-field Taluka] [--power 2] [--k 12] [--radius R] [--smoothing S] [--no-cache]
+"""
+import os
+import sys
+import csv
+import json
+import hashlib
+import argparse
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from scipy import sparse
+from scipy.spatial import cKDTree
+from idw import idw_weights, pixel_centres
+from cog import cog_writer
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "idw")
+
+
+def read_station_keys(shapefile_path, key_field):
+    """Station coordinates (n, 2) and their key_field values from a point layer."""
+    from osgeo import ogr
+
+    source = ogr.Open(shapefile_path)
+    if source is None:
+        raise FileNotFoundError(f"Station file not found: {shapefile_path}")
+    coords, keys = [], []
+    for feature in source.GetLayer():
+        geometry = feature.GetGeometryRef()
+        if geometry is None:
+            continue
+        coords.append((geometry.GetX(), geometry.GetY()))
+        keys.append(str(feature.GetField(key_field)).strip())
+    return np.array(coords, dtype=float), keys
+
+
+def read_series(csv_path, keys):
+    """
+    (stations x T) float32 matrix in the order of keys, plus the time step
+    names from the header. Keys are matched case-insensitively.
+    """
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        steps = next(reader)[1:]
+        rows = {row[0].strip().lower(): row[1:] for row in reader if row}
+    missing = [key for key in keys if key.lower() not in rows]
+    if missing:
+        raise ValueError(f"No rainfall series for stations: {', '.join(missing)}")
+    series = np.array([[float(v) if v.strip() else np.nan for v in rows[key.lower()]] for key in keys],
+                      dtype=np.float32)
+    return series, steps
+
+
+def weight_matrix(coords, transform, height, width, rows_per_chunk=256, **options):
+    """
+    Sparse (pixels x stations) CSR matrix of normalized IDW weights, one row
+    per pixel in row-major order. Pixels with no station in range have an
+    empty row.
+    """
+    tree = cKDTree(coords)
+    blocks = []
+    for row in range(0, height, rows_per_chunk):
+        window = Window(0, row, width, min(rows_per_chunk, height - row))
+        indices, weights = idw_weights(tree, pixel_centres(transform, window), **options)
+        pixels, k = indices.shape
+        keep = weights > 0
+        blocks.append(sparse.csr_matrix(
+            (weights[keep], (np.repeat(np.arange(pixels), k)[keep.ravel()], indices[keep])),
+            shape=(pixels, len(coords))))
+    return sparse.vstack(blocks, format="csr")
+
+
+def matrix_key(coords, transform, height, width, options):
+    blob = json.dumps({"coords": np.round(coords, 9).tolist(), "transform": list(transform)[:6],
+                       "shape": [height, width], "options": options}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+def load_weight_matrix(coords, transform, height, width, cache_dir=CACHE_DIR, **options):
+    """weight_matrix() through the on-disk cache, keyed by stations, grid and IDW options."""
+    path = os.path.join(cache_dir, matrix_key(coords, transform, height, width, options) + ".npz")
+    if os.path.exists(path):
+        print(f"Using cached IDW weights ({os.path.basename(path)})")
+        return sparse.load_npz(path)
+    matrix = weight_matrix(coords, transform, height, width, **options)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + ".tmp.npz"
+    sparse.save_npz(tmp, matrix)
+    os.replace(tmp, path)
+    return matrix
+
+
+def write_series(matrix, series, steps, reference_path, output_path, rows_per_chunk=256):
+    """
+    Applies the weight matrix to the (stations x T) series a strip of rows at
+    a time and writes one band per time step.
+    """
+    covered = np.diff(matrix.indptr) > 0
+    with rasterio.open(reference_path) as ref:
+        height, width = ref.height, ref.width
+        meta = {
+            'driver': 'GTiff',
+            'height': height,
+            'width': width,
+            'count': len(steps),
+            'dtype': 'float32',
+            'crs': ref.crs,
+            'transform': ref.transform,
+            'nodata': np.nan
+        }
+    with cog_writer(output_path, resampling="average", **meta) as dst:
+        for band, step in enumerate(steps, start=1):
+            dst.set_band_description(band, step)
+        for row in range(0, height, rows_per_chunk):
+            rows = min(rows_per_chunk, height - row)
+            pixels = slice(row * width, (row + rows) * width)
+            cube = np.asarray(matrix[pixels] @ series, dtype=np.float32)
+            cube[~covered[pixels]] = np.nan
+            dst.write(cube.T.reshape(len(steps), rows, width), window=Window(0, row, width, rows))
+    print(f"{len(steps)} interpolated time steps saved as {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IDW interpolation of a rainfall time series with cached weights.")
+    parser.add_argument("stations")
+    parser.add_argument("series_csv")
+    parser.add_argument("reference_raster")
+    parser.add_argument("output_tif")
+    parser.add_argument("--key-field", default="Taluka", help="Station field matching the CSV's first column.")
+    parser.add_argument("--power", type=float, default=2.0)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--radius", type=float, default=np.inf)
+    parser.add_argument("--smoothing", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(sys.argv[1:])
+
+    coords, keys = read_station_keys(args.stations, args.key_field)
+    series, steps = read_series(args.series_csv, keys)
+    options = {"power": args.power, "k": args.k, "radius": args.radius, "smoothing": args.smoothing}
+    with rasterio.open(args.reference_raster) as ref:
+        grid = (ref.transform, ref.height, ref.width)
+    if args.no_cache:
+        matrix = weight_matrix(coords, *grid, **options)
+    else:
+        matrix = load_weight_matrix(coords, *grid, **options)
+    print(f"Weight matrix: {matrix.shape[0]} pixels x {matrix.shape[1]} stations, {matrix.nnz} weights")
+    write_series(matrix, series, steps, args.reference_raster, args.output_tif)
@@ -1,15 +1,21 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from osgeo import gdal
+from affine import Affine
 import sys
+from idw import idw_grid, read_stations
+from cog import gdal_write_cog
 
 if len(sys.argv) < 5:
-        print("Usage: python interpolation.py <rainfall_shapefile> <extent_raster> <no_data_value> <smoothened>")
+        print("Usage: python interpolation.py <rainfall_shapefile> <extent_raster> <no_data_value> <smoothened> [gdal|native]")
         sys.exit(1)
 
 dem_file_path = sys.argv[2]
 shapefile_path = sys.argv[1]
-smoothened = bool(sys.argv[4])
+# The GUI passes str(bool), and bool("False") would be True
+smoothened = sys.argv[4].strip().lower() in ("true", "1", "yes")
+# gdal: gdal.Grid invdist over every station; native: k-nearest KD-tree IDW (idw.py)
+engine = sys.argv[5] if len(sys.argv) > 5 else "gdal"
 
 # ===== Load and Process DEM =====
 # Path to your DEM file
@@ -62,23 +68,32 @@ output_raster_path = ""  # Empty string for in-memory raster
 # algorithm = "invdist:power=2:smoothing=1.0"  # Inverse distance weighting
 
 # Interpolation using gdal.Grid
-# algorithm = "invdist:power=2"
+algorithm = "invdist:power=2"  # Inverse distance weighting
+smoothing = 0.0
 if smoothened:
-    algorithm = "invdist:power=2:smoothing=1.0"  # Inverse distance weighting
-
-grid_ds = gdal.Grid(
-    output_raster_path,
-    shapefile_path,
-    format="MEM",  # Keep the raster in memory
-    outputBounds=output_bounds,
-    width=output_width,
-    height=output_height,
-    zfield=rainfall_attribute,
-    algorithm=algorithm,
-)
-
-# Read the interpolated rainfall raster into a NumPy array
-rainfall_grid = grid_ds.ReadAsArray()
+    algorithm = "invdist:power=2:smoothing=1.0"
+    smoothing = 1.0
+
+if engine == "native":
+    # Same weighting, but each pixel only looks at its nearest stations, on the DEM's own grid
+    station_coords, station_values = read_stations(shapefile_path, rainfall_attribute)
+    rainfall_grid = idw_grid(station_coords, station_values, Affine.from_gdal(*geotransform),
+                             output_height, output_width, power=2, smoothing=smoothing)
+    grid_ds = None
+else:
+    grid_ds = gdal.Grid(
+        output_raster_path,
+        shapefile_path,
+        format="MEM",  # Keep the raster in memory
+        outputBounds=output_bounds,
+        width=output_width,
+        height=output_height,
+        zfield=rainfall_attribute,
+        algorithm=algorithm,
+    )
+
+    # Read the interpolated rainfall raster into a NumPy array
+    rainfall_grid = grid_ds.ReadAsArray()
 
 # Check for negative values in the interpolated rainfall grid
 if np.any(rainfall_grid < 0):
@@ -133,22 +148,7 @@ if save_as_tiff:
     # Define output file path
     output_tiff_path = "data/rainfall_clipped.tif"
 
-    # Create a new GDAL dataset for the output
-    driver = gdal.GetDriverByName('GTiff')
-    out_ds = driver.Create(
-        output_tiff_path, 
-        output_width, output_height, 
-        1,  # Number of bands (1 for single band data)
-        gdal.GDT_Float32  # Data type (float32)
-    )
-
-    # Set the geotransform and projection
-    out_ds.SetGeoTransform(geotransform)
-    out_ds.SetProjection(dem_ds.GetProjection())  # Use the DEM projection
-
-    # Write the data to the output TIFF
-    out_ds.GetRasterBand(1).WriteArray(rainfall_clipped)
-
-    # Close the dataset
-    out_ds = None
+    # Write the data as a COG with the DEM's projection
+    gdal_write_cog(output_tiff_path, rainfall_clipped, geotransform, dem_ds.GetProjection(), np.nan,
+                   gdal.GDT_Float32, resampling="average")
     print(f"Output saved to {output_tiff_path}")
@@ -0,0 +1,289 @@
+"""
+Persistent class catalogue for LULC rasters.
+
+One scan over the raster records every class's id, colour, pixel count and
+bounding box in <raster>_catalog.json, next to the raster. Colour/id lookups
+and class counts are then answered from the catalogue without touching the
+image again; it is rebuilt automatically when the raster changes.
+
+Ids come from an integer band (the 4th band written by color_counter.py, or
+band 1 of a paletted raster), or, for plain RGB rasters, are numbered from
+the colours in first-seen or sorted (R, G, B) order.
+
+    python lulc_catalog.py build <raster> [--id-band 4 | --order first-seen|sorted]
+    python lulc_catalog.py id <raster> 255,255,0
+    python lulc_catalog.py color <raster> 12
+    python lulc_catalog.py counts <raster>
+    python lulc_catalog.py query <raster>        # interactive R,G,B / id prompt
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from lulc_codes import ColorCodes, pack_rgb, unpack_rgb
+
+CATALOG_VERSION = 1
+
+
+def catalog_path(raster_path):
+    return raster_path.rsplit(".", 1)[0] + "_catalog.json"
+
+
+def _strips(src, rows_per_strip):
+    for row in range(0, src.height, rows_per_strip):
+        yield Window(0, row, src.width, min(rows_per_strip, src.height - row))
+
+
+def _read_keys(src, window):
+    """Packed colours of a window; nodata becomes 0 as in color_counter.py."""
+    bands = src.read((1, 2, 3), window=window)
+    for band, nodata in zip(bands, src.nodatavals[:3]):
+        if nodata is not None and not np.isnan(nodata):
+            band[band == nodata] = 0
+    return pack_rgb(*bands)
+
+
+class _ClassStats:
+    """Running count, first colour and row/column extent per class id."""
+
+    def __init__(self):
+        self.count = np.zeros(0, dtype=np.int64)
+        self.key = np.zeros(0, dtype=np.int64)
+        self.row_min = np.zeros(0, dtype=np.int64)
+        self.row_max = np.zeros(0, dtype=np.int64)
+        self.col_min = np.zeros(0, dtype=np.int64)
+        self.col_max = np.zeros(0, dtype=np.int64)
+
+    def _grow(self, size):
+        extra = size - len(self.count)
+        if extra <= 0:
+            return
+        self.count = np.concatenate((self.count, np.zeros(extra, dtype=np.int64)))
+        self.key = np.concatenate((self.key, np.full(extra, -1, dtype=np.int64)))
+        big, small = np.iinfo(np.int64).max, -1
+        self.row_min = np.concatenate((self.row_min, np.full(extra, big)))
+        self.col_min = np.concatenate((self.col_min, np.full(extra, big)))
+        self.row_max = np.concatenate((self.row_max, np.full(extra, small)))
+        self.col_max = np.concatenate((self.col_max, np.full(extra, small)))
+
+    def update(self, ids, keys, row_offset, valid=None):
+        """
+        Adds a strip, skipping pixels where valid (if given) is False. Pixels
+        are sorted by id once; each class's count, row and column extent and
+        first colour then come from reduceat over its run, so the cost follows
+        the pixel count, not strip width x class count.
+        """
+        cols = ids.shape[1]
+        positions = np.flatnonzero(valid) if valid is not None else np.arange(ids.size)
+        flat = ids.ravel()[positions].astype(np.int64)
+        if flat.size == 0:
+            return
+        if flat.min() < 0:
+            raise ValueError(f"Class ids must not be negative (found {flat.min()}); "
+                             "if that value marks missing pixels, set it as the band's nodata.")
+        by_id = np.argsort(flat, kind="stable")
+        sorted_ids, order = flat[by_id], positions[by_id]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        present = sorted_ids[starts]
+        self._grow(int(present[-1]) + 1)
+
+        rows, columns = order // cols + row_offset, order % cols
+        self.count[present] += np.diff(np.r_[starts, flat.size])
+        self.row_min[present] = np.minimum(self.row_min[present], np.minimum.reduceat(rows, starts))
+        self.row_max[present] = np.maximum(self.row_max[present], np.maximum.reduceat(rows, starts))
+        self.col_min[present] = np.minimum(self.col_min[present], np.minimum.reduceat(columns, starts))
+        self.col_max[present] = np.maximum(self.col_max[present], np.maximum.reduceat(columns, starts))
+
+        if keys is not None:
+            # The stable sort puts each class's first pixel (row-major) at the start of its run
+            unseen = self.key[present] < 0
+            self.key[present[unseen]] = keys.ravel()[order[starts[unseen]]]
+
+
+def _valid_ids(ids, nodata):
+    """Mask of the pixels that hold a class id rather than the band's nodata, or None to keep all."""
+    if nodata is None:
+        return None
+    if np.isnan(nodata):
+        return ~np.isnan(ids) if np.issubdtype(ids.dtype, np.floating) else None
+    return ids != nodata
+
+
+def build_catalog(raster_path, id_band=None, order="first-seen", rows_per_strip=1024):
+    """
+    Scans the raster once (twice when ids are numbered from colours) and
+    writes its catalogue. Returns the catalogue dict.
+    """
+    stats = _ClassStats()
+    requested_band = id_band
+    with rasterio.open(raster_path) as src:
+        has_rgb = src.count >= 3
+        if id_band is None and not has_rgb:
+            id_band = 1
+        if id_band is None:
+            # Number the colours first, then count them
+            codes = ColorCodes(order)
+            for window in _strips(src, rows_per_strip):
+                codes.update(_read_keys(src, window))
+        # Pixels of an id band that are nodata belong to no class
+        id_nodata = src.nodatavals[id_band - 1] if id_band is not None else None
+        for window in _strips(src, rows_per_strip):
+            keys = _read_keys(src, window) if has_rgb else None
+            ids = src.read(id_band, window=window) if id_band is not None else codes.encode(keys)
+            stats.update(ids, keys, int(window.row_off), _valid_ids(ids, id_nodata))
+
+        palette = src.colormap(id_band) if id_band is not None and not has_rgb and _has_colormap(src, id_band) else {}
+        size = os.stat(raster_path)
+        catalog = {
+            "version": CATALOG_VERSION,
+            "raster": os.path.basename(raster_path),
+            "size": size.st_size,
+            "mtime_ns": size.st_mtime_ns,
+            "width": src.width,
+            "height": src.height,
+            "transform": list(src.transform)[:6],
+            "id_source": f"band {id_band}" if id_band is not None else order,
+            "options": {"id_band": requested_band, "order": order},
+            "classes": []
+        }
+
+    for class_id in np.flatnonzero(stats.count):
+        if stats.key[class_id] >= 0:
+            rgb = [int(v) for v in unpack_rgb([stats.key[class_id]])[0]]
+        elif int(class_id) in palette:
+            rgb = [int(v) for v in palette[int(class_id)][:3]]
+        else:
+            rgb = None
+        catalog["classes"].append({
+            "id": int(class_id),
+            "rgb": rgb,
+            "count": int(stats.count[class_id]),
+            # Inclusive pixel bounding box
+            "bbox": {"row_min": int(stats.row_min[class_id]), "row_max": int(stats.row_max[class_id]),
+                     "col_min": int(stats.col_min[class_id]), "col_max": int(stats.col_max[class_id])}
+        })
+
+    with open(catalog_path(raster_path), "w") as f:
+        json.dump(catalog, f, indent=1)
+    return catalog
+
+
+def _has_colormap(src, band):
+    try:
+        src.colormap(band)
+        return True
+    except ValueError:
+        return False
+
+
+class LulcCatalog:
+    """Colour/id/count lookups for one raster, from its catalogue."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.classes = {c["id"]: c for c in catalog["classes"]}
+        self._by_color = {tuple(c["rgb"]): c["id"] for c in catalog["classes"] if c["rgb"] is not None}
+
+    @classmethod
+    def open(cls, raster_path, id_band=None, order="first-seen"):
+        """Loads the raster's catalogue, (re)building it if missing, stale or built differently."""
+        path = catalog_path(raster_path)
+        stat = os.stat(raster_path)
+        try:
+            with open(path) as f:
+                catalog = json.load(f)
+            fresh = (catalog.get("version") == CATALOG_VERSION and catalog["size"] == stat.st_size
+                     and catalog["mtime_ns"] == stat.st_mtime_ns
+                     and catalog["options"] == {"id_band": id_band, "order": order})
+        except (OSError, ValueError, KeyError):
+            fresh = False
+        if not fresh:
+            print(f"Indexing {raster_path}...")
+            catalog = build_catalog(raster_path, id_band, order)
+        return cls(catalog)
+
+    @property
+    def ids(self):
+        return sorted(self.classes)
+
+    def id_for(self, rgb):
+        """Class id of an (r, g, b) colour, or None."""
+        return self._by_color.get(tuple(int(v) for v in rgb))
+
+    def color_for(self, class_id):
+        """(r, g, b) of a class id, or None."""
+        entry = self.classes.get(int(class_id))
+        return tuple(entry["rgb"]) if entry and entry["rgb"] is not None else None
+
+    def count(self, class_id):
+        entry = self.classes.get(int(class_id))
+        return entry["count"] if entry else 0
+
+    def counts(self):
+        """{id: pixel count}."""
+        return {class_id: entry["count"] for class_id, entry in sorted(self.classes.items())}
+
+    def window(self, class_id):
+        """rasterio Window around every pixel of the class."""
+        box = self.classes[int(class_id)]["bbox"]
+        return Window(box["col_min"], box["row_min"],
+                      box["col_max"] - box["col_min"] + 1, box["row_max"] - box["row_min"] + 1)
+
+
+def parse_rgb(text):
+    return tuple(int(v) for v in text.split(","))
+
+
+def query_loop(catalog):
+    """Answers R,G,B and id queries until 'exit'."""
+    while True:
+        query = input("Enter an RGB value (e.g., 255,255,255) or a class id, or type 'exit' to quit: ")
+        if query.lower() == 'exit':
+            break
+        try:
+            if "," in query:
+                rgb = parse_rgb(query)
+                class_id = catalog.id_for(rgb)
+                if class_id is None:
+                    print(f"RGB value {rgb} not found in the dataset.")
+                else:
+                    print(f"Assigned integer for {rgb}: {class_id} ({catalog.count(class_id)} pixels)")
+            else:
+                class_id = int(query)
+                if class_id in catalog.classes:
+                    print(f"Class {class_id}: RGB {catalog.color_for(class_id)} ({catalog.count(class_id)} pixels)")
+                else:
+                    print(f"Class {class_id} not found in the dataset.")
+        except ValueError:
+            print("Invalid input. Please enter RGB values in the format 'R,G,B' or an integer id.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LULC class catalogue: build it once, query it without rescanning.")
+    parser.add_argument("command", choices=("build", "id", "color", "counts", "query"))
+    parser.add_argument("raster")
+    parser.add_argument("value", nargs="?", help="R,G,B for 'id', a class id for 'color'.")
+    parser.add_argument("--id-band", type=int, help="Band holding class ids (default: number the colours).")
+    parser.add_argument("--order", choices=("first-seen", "sorted"), default="first-seen",
+                        help="Id order when numbering colours.")
+    args = parser.parse_args(sys.argv[1:])
+    options = {"id_band": args.id_band, "order": args.order}
+
+    if args.command == "build":
+        catalog = build_catalog(args.raster, **options)
+        print(f"{len(catalog['classes'])} classes indexed in {catalog_path(args.raster)}")
+        sys.exit(0)
+
+    catalog = LulcCatalog.open(args.raster, **options)
+    if args.command == "id":
+        print(catalog.id_for(parse_rgb(args.value)))
+    elif args.command == "color":
+        print(catalog.color_for(int(args.value)))
+    elif args.command == "counts":
+        for class_id, count in catalog.counts().items():
+            print(f"{class_id}\t{catalog.color_for(class_id)}\t{count}")
+    else:
+        query_loop(catalog)
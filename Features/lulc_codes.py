@@ -0,0 +1,146 @@
+"""
+Integer codes for the colours of an RGB LULC raster.
+
+Each pixel's R, G and B are packed into one 24-bit uint32 key, so finding and
+numbering the distinct colours is plain array work instead of a per-pixel
+tuple/dict loop. Ids follow the order in which colours are first seen in a
+row-major scan (the numbering color_counter.py has always written) or the
+sorted (R, G, B) order of lulcMB.py, and can be built strip by strip.
+"""
+import json
+import numpy as np
+
+
+def pack_rgb(red, green, blue):
+    """uint32 key 0xRRGGBB for 8-bit colour bands."""
+    for band in (red, green, blue):
+        if band.size and (band.min() < 0 or band.max() > 255):
+            raise ValueError("Colour bands must hold 8-bit values (0-255).")
+    return (red.astype(np.uint32) << 16) | (green.astype(np.uint32) << 8) | blue.astype(np.uint32)
+
+
+def unpack_rgb(keys):
+    """(n, 3) uint8 colours for packed keys."""
+    keys = np.asarray(keys, dtype=np.uint32)
+    return np.stack([(keys >> 16) & 0xFF, (keys >> 8) & 0xFF, keys & 0xFF], axis=-1).astype(np.uint8)
+
+
+class ColorCodes:
+    """
+    Numbers colours across strips fed in raster order, either in first-seen
+    order or, with order="sorted", by (R, G, B) (packed keys sort the same way).
+    The id lookup is a sorted key array searched with np.searchsorted.
+    """
+
+    def __init__(self, order="first-seen"):
+        if order not in ("first-seen", "sorted"):
+            raise ValueError(f"Unknown colour order: {order}")
+        self.order = order
+        self.keys = np.empty(0, dtype=np.uint32)
+        self.first_seen = np.empty(0, dtype=np.int64)
+        self.pixels_seen = 0
+        self._ids = None
+
+    def update(self, keys):
+        """Records the colours of the next strip (keys in row-major order)."""
+        keys = keys.reshape(-1)
+        unique, first_index = np.unique(keys, return_index=True)
+        new = ~np.isin(unique, self.keys, assume_unique=True)
+        self.keys = np.concatenate((self.keys, unique[new]))
+        self.first_seen = np.concatenate((self.first_seen, first_index[new] + self.pixels_seen))
+        self.pixels_seen += keys.size
+        self._ids = None
+
+    @property
+    def sorted_keys(self):
+        self._build()
+        return self._sorted_keys
+
+    @property
+    def ids(self):
+        """Id of each entry of sorted_keys."""
+        self._build()
+        return self._ids
+
+    def _build(self):
+        if self._ids is not None:
+            return
+        by_key = np.argsort(self.keys, kind="stable")
+        self._sorted_keys = self.keys[by_key]
+        if self.order == "sorted":
+            self._ids = np.arange(len(self.keys), dtype=np.uint32)
+            return
+        rank = np.empty(len(self.keys), dtype=np.uint32)
+        rank[np.argsort(self.first_seen, kind="stable")] = np.arange(len(self.keys), dtype=np.uint32)
+        self._ids = rank[by_key]
+
+    def encode(self, keys):
+        """uint32 ids for keys that were all passed to update() before."""
+        return self.ids[np.searchsorted(self.sorted_keys, keys)]
+
+    def color_table(self):
+        """{(r, g, b): id} in id order."""
+        order = np.argsort(self.ids, kind="stable")
+        colors = unpack_rgb(self.sorted_keys[order])
+        return {tuple(int(v) for v in color): int(i) for color, i in zip(colors, self.ids[order])}
+
+
+class ColorHistogram:
+    """
+    Running pixel count and area per packed colour. Each block is reduced
+    with np.unique + np.bincount and merged into the sorted totals, so memory
+    grows with the number of distinct colours, not with the raster.
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint32)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.area = np.empty(0, dtype=np.float64)
+
+    def update(self, keys, pixel_area):
+        """
+        Adds a block of packed keys; pixel_area is a scalar or broadcasts
+        against keys (e.g. a per-row column for lat/lon rasters).
+        """
+        block_keys, inverse = np.unique(keys.reshape(-1), return_inverse=True)
+        block_counts = np.bincount(inverse, minlength=len(block_keys))
+        areas = np.broadcast_to(pixel_area, keys.shape).reshape(-1)
+        block_area = np.bincount(inverse, weights=areas, minlength=len(block_keys))
+
+        # Merge into the totals; both key lists are unique, so this is small
+        merged, where = np.unique(np.concatenate((self.keys, block_keys)), return_inverse=True)
+        counts = np.zeros(len(merged), dtype=np.int64)
+        np.add.at(counts, where, np.concatenate((self.counts, block_counts)))
+        self.area = np.bincount(where, weights=np.concatenate((self.area, block_area)), minlength=len(merged))
+        self.counts = counts
+        self.keys = merged
+
+    def table(self):
+        """[(r, g, b), pixel count, area] rows, most frequent first."""
+        order = np.argsort(-self.counts, kind="stable")
+        colors = unpack_rgb(self.keys[order])
+        return [(tuple(int(v) for v in color), int(count), float(area))
+                for color, count, area in zip(colors, self.counts[order], self.area[order])]
+
+
+def encode_colors(red, green, blue, order="first-seen"):
+    """Ids for whole colour bands, plus the colour table."""
+    keys = pack_rgb(red, green, blue)
+    codes = ColorCodes(order)
+    codes.update(keys)
+    return codes.encode(keys), codes.color_table()
+
+
+def sidecar_path(raster_path):
+    return raster_path.rsplit(".", 1)[0] + "_colors.json"
+
+
+def write_color_table(path, color_table):
+    with open(path, "w") as f:
+        json.dump({"colors": [{"id": i, "rgb": list(rgb)} for rgb, i in color_table.items()]}, f, indent=1)
+
+
+def read_color_table(path):
+    """{(r, g, b): id} from a sidecar written by write_color_table."""
+    with open(path) as f:
+        return {tuple(entry["rgb"]): entry["id"] for entry in json.load(f)["colors"]}
@@ -0,0 +1,191 @@
+"""
+Folium map of a risk raster with OSM infrastructure layers.
+
+The risk map is shown as XYZ tiles from risk_tiles.py. Each POI category is
+queried once (from the offline store when it exists) and sampled against the
+risk raster in one vectorized lookup. build_map returns the rendered HTML and
+one GeoJSON FeatureCollection per category, with every point's risk class as
+a property. Each category is one marker-clustered layer whose markers are
+created in the browser from that GeoJSON and coloured by risk.
+"""
+import os
+import sys
+import json
+import numpy as np
+import rasterio
+import folium
+from branca.element import MacroElement
+from folium.plugins import MarkerCluster
+from jinja2 import Template
+from poi_store import overpass_api
+from risk_sampling import sample_risk
+from risk_tiles import TILE_URL
+
+# Overpass filter, layer label and marker style per category; hospitals are coloured by risk
+POI_LAYERS = {
+    "hospital": {"filter": '["amenity"="hospital"]', "label": "Hospitals", "color": None, "icon": "plus-square"},
+    "school": {"filter": '["amenity"="school"]', "label": "Schools", "color": "blue", "icon": "graduation-cap"},
+    "fire_station": {"filter": '["emergency"="fire_station"]', "label": "Fire Stations", "color": "darkred",
+                     "icon": "fire-extinguisher"},
+    "police": {"filter": '["amenity"="police"]', "label": "Police Stations", "color": "cadetblue", "icon": "shield"},
+}
+RISK_LEVELS = {1: ("Low Risk", "green"), 2: ("Moderate Risk", "orange"), 3: ("High Risk", "red")}
+NO_DATA_CLASS = 4
+# Where the map page fetches each category's GeoJSON from
+LAYER_URL = "/layers/{name}.geojson"
+
+
+def read_risk(risk_map_path):
+    """
+    Risk classes (as uint8, like the map scripts always read them), the map's
+    nodata value, transform and bounds. Float maps hold No Data as class 4 and
+    compact maps as 0; a map without a (non-NaN) nodata value uses class 4.
+    """
+    with rasterio.open(risk_map_path) as src:
+        nodata = NO_DATA_CLASS if src.nodata is None or np.isnan(src.nodata) else int(src.nodata)
+        return np.nan_to_num(src.read(1), nan=nodata).astype(np.uint8), nodata, src.transform, src.bounds
+
+
+def poi_layer(api, name, bbox, risk_data, transform, nodata=NO_DATA_CLASS):
+    """
+    GeoJSON FeatureCollection of one category's nodes on the risk raster.
+    Points off the raster are dropped, and hospitals on nodata as well.
+    """
+    south, west, north, east = bbox
+    try:
+        result = api.query(f"node{POI_LAYERS[name]['filter']}({south},{west},{north},{east});out;")
+    except Exception as e:
+        print(f"Error querying {name}: {e}")
+        return {"type": "FeatureCollection", "features": []}
+
+    nodes = result.nodes
+    samples = sample_risk([(float(node.lon), float(node.lat)) for node in nodes], risk_data, transform)
+    features = []
+    for node, sample in zip(nodes, samples):
+        if not sample["inside"]:
+            continue
+        risk = int(sample["risk"])
+        if name == "hospital" and risk == nodata:
+            continue
+        features.append({
+            "type": "Feature",
+            "id": int(node.id),
+            # 6 decimals (about 0.1 m) keep the layer compact
+            "geometry": {"type": "Point", "coordinates": [round(float(sample["x"]), 6), round(float(sample["y"]), 6)]},
+            "properties": {"name": node.tags.get("name", name.replace("_", " ").title()),
+                           "risk": risk if risk in RISK_LEVELS else None}
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+class ClusteredPoints(MacroElement):
+    """
+    Fills its parent MarkerCluster with the points of a GeoJSON layer, fetched
+    from url (or embedded when url is None), one marker coloured by the
+    feature's risk class. Markers are only created in the browser, so the
+    page stays small however many points there are.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var style = {{ this.style|tojson }};
+            function add(data) {
+                var layer = L.geoJSON(data, {
+                    pointToLayer: function(feature, latlng) {
+                        var color = style.risk_colors[feature.properties.risk] || style.color;
+                        return L.marker(latlng, {icon: L.AwesomeMarkers.icon(
+                            {icon: style.icon, prefix: "fa", markerColor: color})});
+                    },
+                    onEachFeature: function(feature, marker) {
+                        var risk = style.risk_labels[feature.properties.risk];
+                        var popup = document.createElement("div");
+                        popup.textContent = feature.properties.name + " (" + style.title + ")" + (risk ? ", " + risk : "");
+                        marker.bindPopup(popup);
+                    }
+                });
+                {{ this._parent.get_name() }}.addLayers(layer.getLayers());
+            }
+            {%- if this.url %}
+            fetch({{ this.url|tojson }}).then(function(response) { return response.json(); }).then(add);
+            {%- else %}
+            add({{ this.data|tojson }});
+            {%- endif %}
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, style, url=None, data=None):
+        super().__init__()
+        self._name = "ClusteredPoints"
+        self.style = style
+        self.url = url
+        self.data = data
+
+
+def add_layer(m, name, layer, layer_url=LAYER_URL):
+    """One clustered, risk-coloured layer for a category, toggled in the layer control."""
+    style = POI_LAYERS[name]
+    cluster = MarkerCluster(name=style["label"], options={"chunkedLoading": True}).add_to(m)
+    cluster.add_child(ClusteredPoints({
+        "title": name.replace("_", " ").title(),
+        "icon": style["icon"],
+        # Hospitals take their colour from the risk class, the other categories have a fixed colour
+        "color": style["color"] or "gray",
+        "risk_colors": {str(risk): color for risk, (_, color) in RISK_LEVELS.items()} if style["color"] is None else {},
+        "risk_labels": {str(risk): label for risk, (label, _) in RISK_LEVELS.items()},
+    }, url=layer_url.format(name=name) if layer_url else None, data=None if layer_url else layer))
+
+
+def build_map(risk_map_path, layers=tuple(POI_LAYERS), api=None, layer_url=LAYER_URL, tile_url=TILE_URL):
+    """
+    (HTML page, {category: GeoJSON dict}) for a risk map and POI categories.
+    The page loads each category from layer_url (as served by map_service.py);
+    with layer_url=None the GeoJSON is embedded in the page instead. The
+    risk tiles come from tile_url (risk_tiles.tile_url). Without an api, the
+    default one is opened for this build and closed after it.
+    """
+    if api is None:
+        with overpass_api() as api:
+            return build_map(risk_map_path, layers, api, layer_url, tile_url)
+
+    risk_data, nodata, transform, bounds = read_risk(risk_map_path)
+    bbox = (bounds.bottom, bounds.left, bounds.top, bounds.right)
+
+    m = folium.Map(location=[(bounds.bottom + bounds.top) / 2, (bounds.left + bounds.right) / 2], zoom_start=12)
+    folium.TileLayer(
+        tiles=tile_url,
+        attr="Flood risk model",
+        name="Flood Risk Map",
+        overlay=True,
+        opacity=0.6,
+        zindex=1
+    ).add_to(m)
+
+    geojson = {}
+    for name in layers:
+        geojson[name] = poi_layer(api, name, bbox, risk_data, transform, nodata)
+        add_layer(m, name, geojson[name], layer_url)
+    folium.LayerControl().add_to(m)
+    return m.get_root().render(), geojson
+
+
+def export_map(risk_map_path, output_dir, layers=tuple(POI_LAYERS)):
+    """
+    Writes map.html, with the layers embedded, and one <category>.geojson per
+    layer. The risk tiles in the page still come from a running map service.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    html, geojson = build_map(risk_map_path, layers, layer_url=None)
+    with open(os.path.join(output_dir, "map.html"), "w", encoding="utf-8") as f:
+        f.write(html)
+    for name, layer in geojson.items():
+        with open(os.path.join(output_dir, f"{name}.geojson"), "w", encoding="utf-8") as f:
+            json.dump(layer, f, separators=(",", ":"))
+        print(f"{len(layer['features'])} {POI_LAYERS[name]['label'].lower()} written to {name}.geojson")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python map_builder.py <path_to_risk_map> <output_dir> [layer ...]")
+        sys.exit(1)
+    export_map(sys.argv[1], sys.argv[2], sys.argv[3:] or tuple(POI_LAYERS))
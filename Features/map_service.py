@@ -0,0 +1,207 @@
+"""
+Long-lived Flask service for the risk web map.
+
+One Flask app serves the current map page, its POI layers as GeoJSON and the
+risk tiles. Pages are built once per (risk map content hash, POI layers) and
+kept, together with a gzip copy and an ETag, so page loads never re-render
+the folium template and revisiting an earlier map is instant. Each page
+loads its tiles under the risk map's content hash, so a newly published map
+never shows tiles the browser cached for the previous one. New risk maps
+are published in-process with publish() or, from another process, through
+POST /reload; nothing restarts and no extra server threads are started.
+
+    service = MapService()
+    service.publish("combined_risk.tif")
+    service.start()                     # background thread, once
+
+    python map_service.py <risk_map> [layer ...]   # publish to a running service, or serve
+"""
+import os
+import sys
+import gzip
+import json
+import hashlib
+import threading
+import urllib.error
+import urllib.request
+import webbrowser
+from dataclasses import dataclass
+from map_builder import LAYER_URL, POI_LAYERS, build_map
+from risk_tiles import CACHE_DIR, TileRenderer, register_tile_routes, tile_url
+from terrain_cache import file_sha256
+
+HOST, PORT = "127.0.0.1", 5000
+
+
+@dataclass
+class CachedBody:
+    """A response body with its gzip copy and ETag, computed once."""
+    body: bytes
+    gzipped: bytes
+    etag: str
+    mimetype: str
+
+    @classmethod
+    def of(cls, body, mimetype):
+        return cls(body, gzip.compress(body, 6), hashlib.sha256(body).hexdigest()[:32], mimetype)
+
+
+@dataclass
+class PublishedMap:
+    risk_map_path: str
+    layers: tuple
+    page: CachedBody
+    geojson: dict
+    # Content hash of the risk map; also the version in the page's tile URLs
+    digest: str
+
+
+class MapService:
+    def __init__(self, host=HOST, port=PORT, max_maps=8, api=None, tile_cache_dir=CACHE_DIR):
+        """
+        api answers the POI queries and stays owned by the caller; by default
+        each build opens overpass_api() and closes it again. Rendered tiles
+        are kept under tile_cache_dir.
+        """
+        from flask import Flask
+
+        self.api = api
+        self.host, self.port = host, port
+        self.max_maps = max_maps
+        self.url = f"http://{host}:{port}/"
+        self.current = None
+        self.tile_renderer = None
+        self.tile_cache_dir = tile_cache_dir
+        self._maps = {}
+        self._digests = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.app = Flask(__name__)
+        self._add_routes()
+        register_tile_routes(self.app, lambda: self.tile_renderer)
+
+    # ----- Publishing -----
+    def risk_digest(self, risk_map_path):
+        """Content hash of a risk map, remembered per (size, mtime)."""
+        stat = os.stat(risk_map_path)
+        key = (os.path.abspath(risk_map_path), stat.st_size, stat.st_mtime_ns)
+        if key not in self._digests:
+            self._digests[key] = file_sha256(risk_map_path)
+        return self._digests[key]
+
+    def publish(self, risk_map_path, layers=tuple(POI_LAYERS), rebuild=False):
+        """
+        Makes risk_map_path the map being served, building its page only if
+        this content and layer set have not been published before.
+        """
+        layers = tuple(layers)
+        unknown = [name for name in layers if name not in POI_LAYERS]
+        if unknown:
+            raise ValueError(f"Unknown POI layers: {', '.join(unknown)}")
+        digest = self.risk_digest(risk_map_path)
+        key = (digest, layers)
+        with self._lock:
+            published = None if rebuild else self._maps.get(key)
+            if published is None:
+                print(f"Building map for {risk_map_path} ({', '.join(layers) or 'no POI layers'})")
+                html, geojson = build_map(risk_map_path, layers, self.api, tile_url=tile_url(digest))
+                published = PublishedMap(risk_map_path, layers, CachedBody.of(html.encode(), "text/html"),
+                                         {name: CachedBody.of(json.dumps(layer, separators=(",", ":")).encode(),
+                                                               "application/geo+json")
+                                          for name, layer in geojson.items()},
+                                         digest)
+                self._maps.pop(key, None)
+                self._maps[key] = published
+                while len(self._maps) > self.max_maps:
+                    self._maps.pop(next(iter(self._maps)))
+            # Tiles are keyed by path, size and mtime and served under the content hash,
+            # so reopen whenever either differs
+            if (self.tile_renderer is None or self.tile_renderer.version != digest
+                    or self.tile_renderer.cache_dir != TileRenderer.cache_dir_for(risk_map_path, self.tile_cache_dir)):
+                self._swap_tiles(risk_map_path, digest)
+            self.current = published
+        return published
+
+    def _swap_tiles(self, risk_map_path, digest):
+        old, self.tile_renderer = self.tile_renderer, TileRenderer(risk_map_path, self.tile_cache_dir, version=digest)
+        if old is not None:
+            old.close()
+
+    # ----- Serving -----
+    def _add_routes(self):
+        from flask import Response, abort, jsonify, request
+
+        def send(cached):
+            if cached.etag in request.if_none_match:
+                return Response(status=304, headers={"ETag": f'"{cached.etag}"'})
+            headers = {"ETag": f'"{cached.etag}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+            if "gzip" in request.headers.get("Accept-Encoding", ""):
+                headers["Content-Encoding"] = "gzip"
+                return Response(cached.gzipped, mimetype=cached.mimetype, headers=headers)
+            return Response(cached.body, mimetype=cached.mimetype, headers=headers)
+
+        @self.app.route("/")
+        def index():
+            if self.current is None:
+                return "No risk map has been published yet.", 404
+            return send(self.current.page)
+
+        @self.app.route(LAYER_URL.replace("{name}", "<name>"))
+        def layer(name):
+            if self.current is None or name not in self.current.geojson:
+                abort(404)
+            return send(self.current.geojson[name])
+
+        @self.app.route("/reload", methods=["POST"])
+        def reload():
+            options = request.get_json(force=True)
+            try:
+                published = self.publish(options["risk_map"], options.get("layers", tuple(POI_LAYERS)),
+                                         options.get("rebuild", False))
+            except (KeyError, OSError, ValueError) as e:
+                return jsonify(error=str(e)), 400
+            return jsonify(risk_map=published.risk_map_path, layers=list(published.layers),
+                           etag=published.page.etag)
+
+    def start(self):
+        """Serves on a daemon thread; later calls do nothing."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.serve, daemon=True)
+            self._thread.start()
+        return self.url
+
+    def serve(self):
+        self.app.run(host=self.host, port=self.port, debug=False, use_reloader=False, threaded=True)
+
+
+def request_reload(risk_map_path, layers=tuple(POI_LAYERS), host=HOST, port=PORT, timeout=600):
+    """Publishes a risk map to a service running in another process; False if none is running."""
+    body = json.dumps({"risk_map": os.path.abspath(risk_map_path), "layers": list(layers)}).encode()
+    req = urllib.request.Request(f"http://{host}:{port}/reload", data=body,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"The map service rejected {risk_map_path}: {e.read().decode()}")
+    except (urllib.error.URLError, ConnectionError):
+        return False
+
+
+def publish_or_serve(risk_map_path, layers=tuple(POI_LAYERS)):
+    """Hands the map to a running service, or becomes the service (blocking)."""
+    if request_reload(risk_map_path, layers):
+        print(f"Published {risk_map_path} to the running map service at http://{HOST}:{PORT}/")
+        return
+    service = MapService()
+    service.publish(risk_map_path, layers)
+    threading.Timer(1.0, webbrowser.open, (service.url,)).start()
+    service.serve()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python map_service.py <path_to_risk_map> [layer ...]")
+        sys.exit(1)
+    publish_or_serve(sys.argv[1], sys.argv[2:] or tuple(POI_LAYERS))
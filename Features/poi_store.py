@@ -0,0 +1,270 @@
+"""
+Offline store of OpenStreetMap points of interest.
+
+POIs are imported once from a local GeoJSON or .osm.pbf extract (the latter
+needs the optional osmium package) into a SQLite file with an R*Tree on the
+point coordinates and an index on the tags. Bounding-box + tag queries then
+run in milliseconds with no network. OfflineOverpass answers the
+node[...](south,west,north,east);out; queries the map scripts send to
+overpy.Overpass, with result objects of the same shape, so it can be swapped
+in for the live API (and used in tests).
+
+    python poi_store.py import pune-latest.osm.pbf [--db data/osm_pois.sqlite] [--replace]
+    python poi_store.py import hospitals.geojson
+    python poi_store.py query 18.4 73.7 18.7 74.0 amenity=hospital
+"""
+import os
+import re
+import sys
+import json
+import sqlite3
+import argparse
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "osm_pois.sqlite")
+
+# Nodes with one of these keys are imported from .osm.pbf extracts
+POI_KEYS = ("amenity", "emergency", "healthcare", "shop", "office", "tourism")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pois (
+    id INTEGER PRIMARY KEY,
+    osm_type TEXT NOT NULL,
+    osm_id INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    tags TEXT NOT NULL,
+    UNIQUE (osm_type, osm_id)
+);
+CREATE TABLE IF NOT EXISTS poi_tags (
+    poi_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS poi_tags_key_value ON poi_tags (key, value, poi_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS poi_index USING rtree (id, min_lon, max_lon, min_lat, max_lat);
+"""
+
+
+@dataclass
+class POI:
+    id: int
+    lat: float
+    lon: float
+    tags: dict = field(default_factory=dict)
+    osm_type: str = "node"
+
+
+class POIStore:
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # Flask builds maps on its request threads; callers serialize their use of one store
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----- Import -----
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM pois")
+            self.db.execute("DELETE FROM poi_tags")
+            self.db.execute("DELETE FROM poi_index")
+
+    def add(self, pois):
+        """Inserts POIs in one transaction, skipping OSM objects already stored. Returns the number added."""
+        added = 0
+        with self.db:
+            for poi in pois:
+                cursor = self.db.execute(
+                    "INSERT OR IGNORE INTO pois (osm_type, osm_id, lat, lon, tags) VALUES (?, ?, ?, ?, ?)",
+                    (poi.osm_type, poi.id, poi.lat, poi.lon, json.dumps(poi.tags)))
+                if cursor.rowcount == 0:
+                    continue
+                row_id = cursor.lastrowid
+                self.db.execute("INSERT INTO poi_index VALUES (?, ?, ?, ?, ?)",
+                                (row_id, poi.lon, poi.lon, poi.lat, poi.lat))
+                self.db.executemany("INSERT INTO poi_tags VALUES (?, ?, ?)",
+                                    [(row_id, key, str(value)) for key, value in poi.tags.items()])
+                added += 1
+        return added
+
+    def import_file(self, path, keys=POI_KEYS):
+        if path.endswith(".osm.pbf") or path.endswith(".osm"):
+            pois = read_osm(path, keys)
+        else:
+            pois = read_geojson(path)
+        added = self.add(pois)
+        print(f"Imported {added} POIs from {path} into {self.db_path}")
+        return added
+
+    # ----- Queries -----
+    def query(self, bbox, tags=None):
+        """
+        POIs inside bbox = (south, west, north, east), edges included, that
+        carry every tag in tags, a {key: value} dict where a None value only
+        requires the key.
+        """
+        south, west, north, east = bbox
+        sql = ["SELECT p.osm_type, p.osm_id, p.lat, p.lon, p.tags FROM poi_index r JOIN pois p ON p.id = r.id",
+               "WHERE r.max_lon >= ? AND r.min_lon <= ? AND r.max_lat >= ? AND r.min_lat <= ?",
+               # The R*Tree keeps float32 boxes rounded outwards, so check the exact point as well
+               "AND p.lon BETWEEN ? AND ? AND p.lat BETWEEN ? AND ?"]
+        params = [west, east, south, north, west, east, south, north]
+        # Each tag filter is one indexed subquery, materialized once rather than probed per row
+        for key, value in (tags or {}).items():
+            if value is None:
+                sql.append("AND p.id IN (SELECT poi_id FROM poi_tags WHERE key = ?)")
+                params.append(key)
+            else:
+                sql.append("AND p.id IN (SELECT poi_id FROM poi_tags WHERE key = ? AND value = ?)")
+                params.extend((key, str(value)))
+        rows = self.db.execute(" ".join(sql), params)
+        return [POI(osm_id, lat, lon, json.loads(tags_json), osm_type)
+                for osm_type, osm_id, lat, lon, tags_json in rows]
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM pois").fetchone()[0]
+
+
+# ----- Readers -----
+def _geojson_point(geometry):
+    """(lon, lat) of a Point, or the mean vertex of any other geometry."""
+    if geometry["type"] == "Point":
+        return geometry["coordinates"][:2]
+    coords = geometry["coordinates"]
+    while isinstance(coords[0][0], list):
+        coords = [c for part in coords for c in part]
+    return sum(c[0] for c in coords) / len(coords), sum(c[1] for c in coords) / len(coords)
+
+
+def _geojson_id(feature, index):
+    """(osm_type, osm_id) from ids like "node/123", 123 or an @id/osm_id property."""
+    properties = feature.get("properties") or {}
+    raw = feature.get("id", properties.get("@id", properties.get("osm_id")))
+    if raw is None:
+        return "feature", index
+    text = str(raw)
+    if "/" in text:
+        osm_type, osm_id = text.split("/", 1)
+        return osm_type, int(osm_id)
+    return properties.get("osm_type", "node"), int(text)
+
+
+def read_geojson(path):
+    with open(path) as f:
+        features = json.load(f)["features"]
+    for index, feature in enumerate(features):
+        if not feature.get("geometry"):
+            continue
+        lon, lat = _geojson_point(feature["geometry"])
+        osm_type, osm_id = _geojson_id(feature, index)
+        tags = {key: value for key, value in (feature.get("properties") or {}).items()
+                if not key.startswith("@") and key not in ("osm_id", "osm_type") and value is not None}
+        yield POI(osm_id, float(lat), float(lon), tags, osm_type)
+
+
+def read_osm(path, keys=POI_KEYS):
+    """Tagged nodes with any of keys from an .osm/.osm.pbf extract."""
+    try:
+        import osmium
+    except ImportError:
+        raise ImportError("Reading .osm.pbf extracts needs the osmium package (pip install osmium); "
+                          "GeoJSON extracts work without it.")
+
+    for obj in osmium.FileProcessor(path, osmium.osm.NODE):
+        tags = {tag.k: tag.v for tag in obj.tags}
+        if obj.location.valid() and any(key in tags for key in keys):
+            yield POI(obj.id, obj.location.lat, obj.location.lon, tags)
+
+
+# ----- Overpass stand-in -----
+QUERY_PATTERN = re.compile(r"^\s*node((?:\[[^\]]+\])*)\(([^)]*)\);\s*out;?\s*$")
+FILTER_PATTERN = re.compile(r'\[\s*"([^"]+)"\s*(?:=\s*"([^"]*)")?\s*\]')
+
+
+@dataclass
+class OverpassResult:
+    """The part of overpy.Result the map scripts use."""
+    nodes: list
+
+    @property
+    def ways(self):
+        return []
+
+
+class OfflineOverpass:
+    """Answers node["key"="value"](south,west,north,east);out; queries from a POIStore."""
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def parse(query):
+        """(bbox, tags) of a supported Overpass QL query."""
+        match = QUERY_PATTERN.match(query)
+        if match is None:
+            raise ValueError(f"Unsupported Overpass query for the offline store: {query}")
+        filters, bbox = match.groups()
+        # findall gives "" when a filter has no value: ["key"] only requires the key
+        tags = {key: (value or None) for key, value in FILTER_PATTERN.findall(filters)}
+        return tuple(float(v) for v in bbox.split(",")), tags
+
+    def query(self, query):
+        bbox, tags = self.parse(query)
+        return OverpassResult(self.store.query(bbox, tags))
+
+
+@contextmanager
+def overpass_api(db_path=DEFAULT_DB):
+    """
+    OfflineOverpass on the local store when it has been imported, otherwise
+    the live overpy API. The store is closed when the with block ends.
+
+        with overpass_api() as api:
+            api.query(...)
+    """
+    if not os.path.exists(db_path):
+        import overpy
+        yield overpy.Overpass()
+        return
+    print(f"Using the offline POI store {os.path.abspath(db_path)}")
+    with POIStore(db_path) as store:
+        yield OfflineOverpass(store)
+
+
+def parse_tag(text):
+    key, _, value = text.partition("=")
+    return key, value or None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline OpenStreetMap POI store.")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="Load POIs from a .osm.pbf or GeoJSON extract.")
+    importer.add_argument("extract")
+    importer.add_argument("--keys", nargs="+", default=POI_KEYS, help="Node keys to keep from .osm.pbf extracts.")
+    importer.add_argument("--replace", action="store_true", help="Empty the store first.")
+    finder = commands.add_parser("query", help="POIs in a bounding box with the given tags.")
+    finder.add_argument("bbox", type=float, nargs=4, metavar=("SOUTH", "WEST", "NORTH", "EAST"))
+    finder.add_argument("tags", nargs="*", help="key=value or key")
+    args = parser.parse_args(sys.argv[1:])
+
+    with POIStore(args.db) as store:
+        if args.command == "import":
+            if args.replace:
+                store.clear()
+            store.import_file(args.extract, args.keys)
+        else:
+            for poi in store.query(args.bbox, dict(parse_tag(t) for t in args.tags)):
+                print(f"{poi.osm_type}/{poi.id}\t{poi.lat:.6f}\t{poi.lon:.6f}\t{poi.tags.get('name', '')}")
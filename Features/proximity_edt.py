@@ -0,0 +1,117 @@
+"""
+Proximity (distance to the nearest target class) with an exact Euclidean
+distance transform.
+
+Targets are the pixels of an integer LULC band whose value is in a class
+list. Distances are float32 metres: the pixel sampling comes from the
+geotransform, converted at the strip's centre latitude for lat/lon rasters.
+With a max distance, far pixels are clamped to it and the transform skips
+whatever lies beyond the cap around the targets, which saves most of the work
+when targets are sparse. The raster can then also be processed in
+overlapping full-width strips. The overlap only needs to cover the cap, so
+each strip is exact up to max_distance; the overlap rows are computed twice,
+so strips should be tall compared with the cap.
+
+Usage: python proximity_edt.py <lulc_raster> <output_tif> <class> [<class> ...]
+           [--band 4] [--max-distance M] [--strip-rows 1024]
+"""
+import sys
+import math
+import argparse
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from scipy.ndimage import distance_transform_edt
+from terrain import EARTH_RADIUS, is_geographic
+from cog import cog_writer
+
+
+def metre_sampling(transform, geographic, centre_row):
+    """(row, column) pixel size in metres, for the latitude of centre_row on lat/lon grids."""
+    dx, dy = abs(transform.a), abs(transform.e)
+    if not geographic:
+        return dy, dx
+    metres_per_degree = EARTH_RADIUS * math.pi / 180
+    latitude = math.radians(transform.f + transform.e * centre_row)
+    return dy * metres_per_degree, dx * metres_per_degree * math.cos(latitude)
+
+
+def proximity_array(classes, target_values, sampling, max_distance=None):
+    """
+    float32 distance from every pixel to the nearest target pixel. Without
+    targets every pixel is far: max_distance, or inf if there is no cap
+    (NaN would be nodata and drop the pixels from the classification).
+    With a cap the transform only runs over the targets' bounding box grown
+    by max_distance; everything outside it is further away and set to the cap.
+    """
+    targets = np.isin(classes, target_values)
+    if not targets.any():
+        return np.full(classes.shape, np.inf if max_distance is None else max_distance, dtype=np.float32)
+    if max_distance is None:
+        return distance_transform_edt(~targets, sampling=sampling).astype(np.float32)
+
+    target_rows, target_cols = np.flatnonzero(targets.any(axis=1)), np.flatnonzero(targets.any(axis=0))
+    pad_rows, pad_cols = (int(math.ceil(max_distance / size)) for size in sampling)
+    box = (slice(max(target_rows[0] - pad_rows, 0), target_rows[-1] + pad_rows + 1),
+           slice(max(target_cols[0] - pad_cols, 0), target_cols[-1] + pad_cols + 1))
+    distance = np.full(classes.shape, max_distance, dtype=np.float32)
+    distance[box] = np.minimum(distance_transform_edt(~targets[box], sampling=sampling), max_distance)
+    return distance
+
+
+def iter_proximity_strips(src, target_values, band=4, max_distance=None, strip_rows=None):
+    """
+    Yields (window, distances). Without strip_rows (or without a cap, when a
+    strip cannot know how far away the nearest target is) the whole band is
+    done at once; otherwise strips are read with enough extra rows above and
+    below to find every target within max_distance.
+    """
+    geographic = is_geographic(src)
+    if strip_rows is None or max_distance is None:
+        sampling = metre_sampling(src.transform, geographic, src.height / 2)
+        window = Window(0, 0, src.width, src.height)
+        yield window, proximity_array(src.read(band), target_values, sampling, max_distance)
+        return
+
+    for row in range(0, src.height, strip_rows):
+        rows = min(strip_rows, src.height - row)
+        sampling = metre_sampling(src.transform, geographic, row + rows / 2)
+        halo = int(math.ceil(max_distance / sampling[0])) + 1
+        top = max(row - halo, 0)
+        bottom = min(row + rows + halo, src.height)
+        classes = src.read(band, window=Window(0, top, src.width, bottom - top))
+        distance = proximity_array(classes, target_values, sampling, max_distance)
+        yield Window(0, row, src.width, rows), distance[row - top:row - top + rows]
+
+
+def write_proximity(lulc_path, output_path, target_values, band=4, max_distance=None, strip_rows=None):
+    with rasterio.open(lulc_path) as src:
+        meta = {
+            'driver': 'GTiff',
+            'height': src.height,
+            'width': src.width,
+            'count': 1,
+            'dtype': 'float32',
+            'crs': src.crs,
+            'transform': src.transform,
+            'nodata': np.nan
+        }
+        with cog_writer(output_path, resampling="average", **meta) as dst:
+            for window, distance in iter_proximity_strips(src, target_values, band, max_distance, strip_rows):
+                dst.write(distance, 1, window=window)
+    print(f"Proximity raster saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distance in metres to the nearest pixel of the given LULC classes.")
+    parser.add_argument("lulc_raster")
+    parser.add_argument("output_tif")
+    parser.add_argument("classes", type=int, nargs="+")
+    parser.add_argument("--band", type=int, default=4, help="Band holding the integer class ids.")
+    parser.add_argument("--max-distance", type=float, help="Clamp distances beyond this many metres.")
+    parser.add_argument("--strip-rows", type=int,
+                        help="Process overlapping strips of this many rows (needs --max-distance).")
+    args = parser.parse_args(sys.argv[1:])
+    if args.strip_rows and args.max_distance is None:
+        parser.error("--strip-rows needs --max-distance")
+    write_proximity(args.lulc_raster, args.output_tif, args.classes, args.band, args.max_distance, args.strip_rows)
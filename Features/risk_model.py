@@ -0,0 +1,478 @@
+"""
+Headless four-factor flood risk engine (slope, elevation, rainfall, proximity).
+
+    from risk_model import RiskModelConfig, run_risk_model
+    result = run_risk_model(RiskModelConfig(dem_file_path=..., ...))
+
+run_risk_model returns arrays and metadata and never plots, so the FRIZ dialog
+and batch jobs can call it in-process. slopeelerainprox.py is the command-line
+front end.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import rasterio
+from scipy.ndimage import gaussian_filter
+from align import AlignedRaster
+from classify import classify
+from cog import cog_writer, write_cog
+from terrain import fused_smooth_slope, is_geographic, terrain_derivatives
+from terrain_cache import TerrainCache
+from tiling import gaussian_halo, tile_shape, iter_tiles, pad_window, tile_count
+
+SMOOTHING_SIGMA = 1
+
+# gaussian_filter reaches 4*sigma pixels out and np.gradient needs one more pixel
+# of the smoothed surface, so a window padded by this much gives exact results.
+DEM_HALO = gaussian_halo(SMOOTHING_SIGMA) + 1
+
+
+# ----- DEM & Slope Calculation -----
+def compute_terrain(dem_data, slope_method="gradient", transform=None, geographic=False, row_offset=0):
+    """
+    Returns the smoothed DEM and slope (degrees); negative DEM values become NaN.
+    "gradient" is the original unit-spacing np.gradient slope and "fused" the
+    same quantities from the terrain module's single-pass float32 kernel;
+    "horn" uses the Horn kernel with true pixel sizes from transform.
+    """
+    # Create a mask for negative values in the DEM
+    negative_mask = dem_data < 0
+    dem_data[negative_mask] = np.nan
+
+    if slope_method == "horn":
+        terrain = terrain_derivatives(dem_data, transform, geographic, SMOOTHING_SIGMA, row_offset,
+                                      layers=("smoothed", "slope"))
+        return terrain["smoothed"], terrain["slope"]
+    if slope_method == "fused":
+        smoothed_data, slope = fused_smooth_slope(dem_data, SMOOTHING_SIGMA)
+        slope[negative_mask] = np.nan
+        return smoothed_data, slope
+    if slope_method != "gradient":
+        raise ValueError(f"Unknown slope method: {slope_method}")
+
+    # Apply Gaussian filter for smoothing (optional)
+    smoothed_data = gaussian_filter(dem_data, sigma=SMOOTHING_SIGMA)
+
+    # Calculate the slope (in degrees)
+    x_gradient, y_gradient = np.gradient(smoothed_data)
+    slope = np.arctan(np.sqrt(x_gradient**2 + y_gradient**2)) * (180 / np.pi)
+    slope[negative_mask] = np.nan
+    return smoothed_data, slope
+
+
+# Slope Classification using user-provided thresholds
+def classify_slope(slope_data, low, high):
+    # High flood risk (flat areas) below low, moderate up to and including high,
+    # low flood risk (steep areas) above it; NaN is No Data
+    return classify(slope_data, [low, high], [3, 2, 1], NO_DATA_CLASS, right=[False, True], exact=True)
+
+
+# ----- Rainfall Risk Calculation -----
+def prepare_rainfall(rainfall_data):
+    rainfall_data[rainfall_data < 0] = 0
+    return rainfall_data
+
+
+def classify_rainfall(rainfall_data, low, high):
+    # Low risk below low, medium risk up to high, high risk from high upwards
+    return classify(rainfall_data, [low, high], [1, 2, 3], NO_DATA_CLASS, exact=True)
+
+
+# ----- Elevation Risk Calculation -----
+def classify_elevation(elevation_data, low, high):
+    # High risk (low elevation) from 0 up to low, moderate up to high, low risk
+    # (high elevation) above; negative elevations stay unclassified (0)
+    if low < 0:
+        return classify(elevation_data, [low, high], [0, 2, 1], NO_DATA_CLASS, exact=True)
+    return classify(elevation_data, [0, low, high], [0, 3, 2, 1], NO_DATA_CLASS, exact=True)
+
+
+# ----- Proximity Risk Calculation -----
+def scale_proximity(proximity_data, data_min, data_max):
+    """
+    Rescales proximity to 0-1 using the min/max of the whole raster, so tiles
+    and full reads give the same values. A constant raster carries no signal
+    and becomes NaN.
+    """
+    # Keep float32 layers float32 when the statistics come in as float64
+    data_min, data_max = proximity_data.dtype.type(data_min), proximity_data.dtype.type(data_max)
+    if data_max == data_min:
+        proximity_data[:] = np.nan  # assign a default value
+    elif data_max > 1 or data_min < 0:
+        proximity_data = (proximity_data - data_min) / (data_max - data_min)
+    return proximity_data
+
+
+def nan_range(src, windows):
+    """Min and max of band 1 ignoring NaN, read one window at a time."""
+    data_min, data_max = np.nan, np.nan
+    for window in windows:
+        block = src.read(1, window=window).astype(float)
+        data_min = np.fmin(data_min, np.fmin.reduce(block, axis=None))
+        data_max = np.fmax(data_max, np.fmax.reduce(block, axis=None))
+    return data_min, data_max
+
+
+def classify_proximity(proximity_data, low, high):
+    # High risk close to water bodies, low risk far from them
+    return classify(proximity_data, [low, high], [3, 2, 1], NO_DATA_CLASS, exact=True)
+
+
+# ----- Combine Risks Using Weights -----
+NO_DATA_CLASS = 4
+
+# Every factor class is 1-4, so each fits in two bits (4 is stored as 0) and the
+# four factors pack into a single uint8: slope, rainfall, elevation, proximity
+# from the high bits down. That leaves only 256 possible inputs to combine.
+FACTOR_SHIFTS = (6, 4, 2, 0)
+
+
+def pack_factor_codes(slope_risk, rainfall_risk, elevation_risk, proximity_risk):
+    """Packs four class maps into one uint8 LUT index."""
+    index = np.zeros(np.shape(slope_risk), dtype=np.uint8)
+    for codes in (slope_risk, rainfall_risk, elevation_risk, proximity_risk):
+        index <<= 2
+        index |= np.asarray(codes).astype(np.uint8, copy=False) & 3
+    return index
+
+
+def unpack_lut_index():
+    """Slope, rainfall, elevation and proximity classes (1-4) of all 256 packed indices."""
+    index = np.arange(256, dtype=np.uint8)
+    return tuple(np.where((index >> shift) & 3 == 0, NO_DATA_CLASS, (index >> shift) & 3).astype(int)
+                 for shift in FACTOR_SHIFTS)
+
+
+def risk_luts(weights, nodata_code=NO_DATA_CLASS):
+    """
+    (scenarios, 256) combined classes for (scenarios, 4) weight rows in
+    FACTOR_SHIFTS order (slope, rainfall, elevation, proximity): the weighted
+    sum of the four classes rounded to the nearest class, added in the same
+    order and float64 arithmetic the mask-based combination used. Inputs
+    that combine to No Data (class 4) map to nodata_code.
+    """
+    weights = np.asarray(weights, dtype=float)
+    combined = sum(weights[:, [i]] * classes for i, classes in enumerate(unpack_lut_index()))
+    luts = np.round(combined).astype(np.uint8)
+    luts[luts == NO_DATA_CLASS] = nodata_code
+    return luts
+
+
+def build_risk_lut(weight_slope=0.2, weight_rainfall=0.35, weight_elevation=0.2, weight_proximity=0.25,
+                   nodata_code=NO_DATA_CLASS):
+    """Combined class for each of the 256 packed inputs (see risk_luts)."""
+    total_weight = weight_slope + weight_rainfall + weight_elevation + weight_proximity
+    assert np.isclose(total_weight, 1), "Weights must sum up to 1."
+    return risk_luts([[weight_slope, weight_rainfall, weight_elevation, weight_proximity]], nodata_code)[0]
+
+
+def fuse_risk_classes(factor_risks, lut):
+    """One gather through the LUT instead of per-factor masked arithmetic."""
+    index = pack_factor_codes(factor_risks["slope"], factor_risks["rainfall"],
+                              factor_risks["elevation"], factor_risks["proximity"])
+    return lut[index]
+
+
+def combine_risks_weighted(slope_risk, rainfall_risk, elevation_risk, proximity_risk,
+                           weight_slope=0.2, weight_rainfall=0.35, weight_elevation=0.2, weight_proximity=0.25):
+    lut = build_risk_lut(weight_slope, weight_rainfall, weight_elevation, weight_proximity)
+    return lut[pack_factor_codes(slope_risk, rainfall_risk, elevation_risk, proximity_risk)]
+
+
+FACTOR_CLASSIFIERS = {
+    "slope": classify_slope,
+    "rainfall": classify_rainfall,
+    "elevation": classify_elevation,
+    "proximity": classify_proximity,
+}
+
+
+def factor_thresholds(config, factor):
+    """(low, high) limits of the moderate class for one factor."""
+    return getattr(config, f"{factor}_low"), getattr(config, f"{factor}_high")
+
+
+def classify_factors(config, smoothed_data, slope, rainfall_data, proximity_data):
+    """Class maps (1=low, 2=moderate, 3=high, 4=no data) keyed by factor name."""
+    layers = {"slope": slope, "rainfall": rainfall_data, "elevation": smoothed_data, "proximity": proximity_data}
+    return {factor: FACTOR_CLASSIFIERS[factor](layer, *factor_thresholds(config, factor))
+            for factor, layer in layers.items()}
+
+
+# Output nodata for compact runs: class 4 (No Data) is written as 0, so compact
+# maps hold 0-3 and are the float output with 4 recoded to 0
+COMPACT_NODATA = 0
+
+
+def layer_dtype(config, source_dtype):
+    """
+    dtype to keep an input layer in. Compact runs keep data read as float32
+    (or a smaller type) in float32, which loses nothing; everything else, and
+    every layer derived by arithmetic, stays float64 so classes never change.
+    """
+    if config.compact and np.can_cast(source_dtype, np.float32, "safe"):
+        return np.float32
+    return float
+
+
+def config_lut(config):
+    return build_risk_lut(
+        weight_slope=config.slope_weight,
+        weight_rainfall=config.rainfall_weight,
+        weight_elevation=config.elevation_weight,
+        weight_proximity=config.proximity_weight,
+        nodata_code=COMPACT_NODATA if config.compact else NO_DATA_CLASS
+    )
+
+
+def combine_factors(config, factor_risks):
+    return fuse_risk_classes(factor_risks, config_lut(config))
+
+
+@dataclass
+class RiskModelConfig:
+    """Inputs, AHP weights and middle-class thresholds for one model run."""
+    dem_file_path: str
+    rainfall_file_path: str
+    proximity_file_path: str
+    # Weights for combining risks (must sum to 1)
+    elevation_weight: float
+    slope_weight: float
+    proximity_weight: float
+    rainfall_weight: float
+    # Lower/upper limits of the moderate class for each factor
+    elevation_low: float
+    elevation_high: float
+    slope_low: float
+    slope_high: float
+    rainfall_low: float
+    rainfall_high: float
+    proximity_low: float
+    proximity_high: float
+    # Where to write the combined map; required for tiled runs
+    save_file: Optional[str] = None
+    # Memory-lean mode: a uint8 map with No Data as 0 instead of a float32 map
+    # with No Data as 4, and rainfall read as float32 kept in float32. The
+    # smoothed DEM, slope and scaled proximity stay float64 (rounding them to
+    # float32 would move pixels across thresholds), so classes never change.
+    compact: bool = False
+    # Reuse smoothed DEM and slope from the on-disk terrain cache (in-memory runs)
+    terrain_cache: bool = True
+    tiled: bool = False
+    tile_size: int = 1024
+    workers: int = 1
+    # Rainfall and proximity rasters on a different grid are warped to the DEM's on the fly
+    resampling: str = "bilinear"
+    # "gradient" (unit pixel spacing, the original behaviour), "fused" (the same
+    # slope from one float32 pass) or "horn" (true pixel sizes)
+    slope_method: str = "gradient"
+
+
+@dataclass
+class RiskModelResult:
+    """
+    Output of run_risk_model. Tiled runs stream straight to save_file, so their
+    array fields are None.
+    """
+    transform: object
+    height: int
+    width: int
+    save_file: Optional[str] = None
+    combined_risk: Optional[np.ndarray] = None
+    slope: Optional[np.ndarray] = None
+    factor_risks: dict = field(default_factory=dict)
+
+
+def output_meta(config, height, width, transform, crs):
+    # Class 4 (No Data) is the float output's nodata value; compact output writes it as COMPACT_NODATA
+    meta = {
+        'driver': 'GTiff',
+        'height': height,
+        'width': width,
+        'count': 1,
+        'dtype': 'float32',
+        'crs': crs,
+        'transform': transform,
+        'nodata': NO_DATA_CLASS
+    }
+    if config.compact:
+        meta.update(dtype='uint8', nodata=COMPACT_NODATA)
+    return meta
+
+
+def risk_tile(config, dem, rainfall, proximity, window, proximity_range):
+    """Combined risk for one core window; the DEM is read with a halo and cropped back."""
+    padded, core = pad_window(window, DEM_HALO, dem.height, dem.width)
+    smoothed_data, slope = compute_terrain(dem.read(1, window=padded).astype(float), config.slope_method,
+                                           dem.transform, is_geographic(dem), int(padded.row_off))
+    rainfall_data = rainfall.read(1, window=window)
+    rainfall_data = prepare_rainfall(rainfall_data.astype(layer_dtype(config, rainfall_data.dtype)))
+    proximity_data = scale_proximity(proximity.read(1, window=window).astype(float), *proximity_range)
+    factor_risks = classify_factors(config, smoothed_data[core], slope[core], rainfall_data, proximity_data)
+    return combine_factors(config, factor_risks)
+
+
+# Per-process datasets for pool workers, opened once by the pool initializer
+_worker_sources = None
+
+
+def _open_worker_sources(config):
+    global _worker_sources
+    dem = rasterio.open(config.dem_file_path)
+    _worker_sources = (dem,
+                       AlignedRaster(config.rainfall_file_path, dem, config.resampling),
+                       AlignedRaster(config.proximity_file_path, dem, config.resampling))
+
+
+def _risk_tile_job(config, window, proximity_range):
+    """Pool task: reads its own tile from disk so only the window and result are pickled."""
+    dem, rainfall, proximity = _worker_sources
+    return window, risk_tile(config, dem, rainfall, proximity, window, proximity_range)
+
+
+def iter_parallel_tiles(config, windows, proximity_range, workers):
+    """
+    Yields (window, result) from a process pool, in completion order. At most
+    two tiles per worker are in flight so finished results never pile up.
+    """
+    pending = set()
+    windows = iter(windows)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_sources,
+                             initargs=(config,)) as pool:
+        while True:
+            for window in windows:
+                pending.add(pool.submit(_risk_tile_job, config, window, proximity_range))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def run_tiled(config):
+    """
+    Walks block-aligned windows so peak memory depends on the tile size rather
+    than on the raster size. Each window's result goes straight to save_file.
+    With config.workers > 1 the tiles are computed on a process pool; every tile runs
+    the same code as the serial path, so the output is bit-identical.
+    """
+    workers = config.workers if config.workers > 0 else os.cpu_count()
+    with rasterio.open(config.dem_file_path) as dem, \
+            AlignedRaster(config.rainfall_file_path, dem, config.resampling) as rainfall, \
+            AlignedRaster(config.proximity_file_path, dem, config.resampling) as proximity:
+        rows, cols = tile_shape(dem, config.tile_size)
+        windows = list(iter_tiles(dem.height, dem.width, rows, cols))
+        print(f"Processing {tile_count(dem.height, dem.width, rows, cols)} tiles of {rows}x{cols} pixels"
+              f" on {workers} worker(s)")
+
+        # Proximity is scaled with whole-raster statistics, gathered in a cheap first pass
+        proximity_range = nan_range(proximity, windows)
+        if proximity_range[1] > 1 or proximity_range[0] < 0:
+            print("Proximity data is not scaled between 0 and 1. Normalizing...")
+
+        if workers > 1:
+            results = iter_parallel_tiles(config, windows, proximity_range, workers)
+        else:
+            results = ((window, risk_tile(config, dem, rainfall, proximity, window, proximity_range))
+                       for window in windows)
+
+        meta = output_meta(config, dem.height, dem.width, rainfall.transform, dem.crs)
+        with cog_writer(config.save_file, **meta) as dst:
+            for window, combined_risk_map in results:
+                dst.write(combined_risk_map.astype(meta['dtype']), 1, window=window)
+
+        height, width, transform = dem.height, dem.width, rainfall.transform
+
+    print(f"Output saved as {config.save_file}")
+    return RiskModelResult(transform, height, width, save_file=config.save_file)
+
+
+def load_terrain(config):
+    """
+    Smoothed DEM and slope for the whole DEM. With config.terrain_cache they
+    come memory-mapped from the terrain cache when this DEM was processed
+    with the same parameters before. Both are derived layers, so they are
+    float64 in every mode (see layer_dtype).
+    """
+    dtype = float
+
+    def compute():
+        with rasterio.open(config.dem_file_path) as dem:
+            dem_data = dem.read(1).astype(dtype)  # convert to float for NaN handling
+            transform, geographic = dem.transform, is_geographic(dem)
+        smoothed_data, slope = compute_terrain(dem_data, config.slope_method, transform, geographic)
+        return {"smoothed": smoothed_data, "slope": slope}
+
+    if not config.terrain_cache:
+        return compute()
+    params = {"layers": ["smoothed", "slope"], "sigma": SMOOTHING_SIGMA, "slope_method": config.slope_method,
+              "mask": "negative", "dtype": np.dtype(dtype).name}
+    return TerrainCache().get_or_compute(config.dem_file_path, params, compute)
+
+
+def load_layers(config):
+    """
+    Reads the whole-raster inputs: smoothed DEM, slope, rainfall and scaled
+    proximity. Returns (smoothed, slope, rainfall, proximity, transform).
+    """
+    terrain = load_terrain(config)
+    smoothed_data, slope = terrain["smoothed"], terrain["slope"]
+
+    # Rainfall and proximity are read on the DEM's grid, resampled if they differ
+    with rasterio.open(config.dem_file_path) as dem:
+        with AlignedRaster(config.rainfall_file_path, dem, config.resampling) as src:
+            rainfall_data = src.read(1)
+            rainfall_data = prepare_rainfall(rainfall_data.astype(layer_dtype(config, rainfall_data.dtype)))
+            transform = src.transform
+
+        with AlignedRaster(config.proximity_file_path, dem, config.resampling) as src:
+            proximity_data = src.read(1).astype(float)
+
+    # Normalize proximity data if needed (must be between 0 and 1)
+    proximity_min, proximity_max = np.nanmin(proximity_data), np.nanmax(proximity_data)
+    if proximity_max > 1 or proximity_min < 0:
+        print("Proximity data is not scaled between 0 and 1. Normalizing...")
+    proximity_data = scale_proximity(proximity_data, proximity_min, proximity_max)
+    return smoothed_data, slope, rainfall_data, proximity_data, transform
+
+
+def save_combined(config, combined_risk_map, transform):
+    # Use the transform of the (DEM-aligned) rainfall layer and the DEM's CRS
+    height, width = combined_risk_map.shape
+    with rasterio.open(config.dem_file_path) as dem:
+        crs = dem.crs
+    meta = output_meta(config, height, width, transform, crs)
+    write_cog(config.save_file, combined_risk_map.astype(meta['dtype']), **meta)
+    print(f"Output saved as {config.save_file}")
+
+
+def run_in_memory(config):
+    smoothed_data, slope, rainfall_data, proximity_data, transform = load_layers(config)
+    factor_risks = classify_factors(config, smoothed_data, slope, rainfall_data, proximity_data)
+    combined_risk_map = combine_factors(config, factor_risks)
+    height, width = combined_risk_map.shape
+
+    if config.save_file:
+        save_combined(config, combined_risk_map, transform)
+
+    return RiskModelResult(transform, height, width, save_file=config.save_file,
+                           combined_risk=combined_risk_map, slope=slope, factor_risks=factor_risks)
+
+
+def run_risk_model(config):
+    """
+    Runs the model described by a RiskModelConfig without plotting anything.
+    Tiled or multi-worker runs stream to config.save_file and return metadata
+    only; otherwise the combined map, slope and factor class maps are returned.
+    """
+    if config.tiled or config.workers != 1:
+        if not config.save_file:
+            raise ValueError("Tiled runs write straight to disk and need a save_file.")
+        return run_tiled(config)
+    return run_in_memory(config)
+
+
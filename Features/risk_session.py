@@ -0,0 +1,108 @@
+"""
+Long-lived evaluation session for iterating on AHP weights and thresholds.
+
+A RiskSession reads the DEM, rainfall and proximity rasters once and keeps the
+continuous layers, the factor class maps and their packed LUT index resident.
+Re-evaluating with new weights is a single LUT gather; changing one factor's
+thresholds reclassifies only that factor and patches its two bits of the index.
+
+    session = RiskSession(config)
+    result = session.evaluate(config)            # first run classifies everything
+    config.slope_weight, config.rainfall_weight = 0.3, 0.25
+    result = session.evaluate(config)            # weights only: one gather
+"""
+import os
+import numpy as np
+import rasterio
+from risk_model import (FACTOR_CLASSIFIERS, FACTOR_SHIFTS, RiskModelResult, config_lut,
+                        factor_thresholds, load_layers, output_meta, save_combined)
+
+# Order of the factors in the packed index, matching FACTOR_SHIFTS
+FACTORS = ("slope", "rainfall", "elevation", "proximity")
+
+
+def input_signature(config):
+    """
+    (path, size, mtime) of each input raster, like the terrain cache's source
+    key, so a session notices when an input is rewritten on disk.
+    """
+    signature = []
+    for path in (config.dem_file_path, config.rainfall_file_path, config.proximity_file_path):
+        stat = os.stat(path)
+        signature.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+class RiskSession:
+    def __init__(self, config):
+        self.dem_file_path = config.dem_file_path
+        self.rainfall_file_path = config.rainfall_file_path
+        self.proximity_file_path = config.proximity_file_path
+        self.compact = config.compact
+        self.slope_method = config.slope_method
+        self.resampling = config.resampling
+        # Taken before reading, so a rewrite during the load also counts as a change
+        self.inputs = input_signature(config)
+
+        smoothed_data, slope, rainfall_data, proximity_data, self.transform = load_layers(config)
+        self.layers = {"slope": slope, "rainfall": rainfall_data,
+                       "elevation": smoothed_data, "proximity": proximity_data}
+        self.height, self.width = slope.shape
+        with rasterio.open(config.dem_file_path) as dem:
+            self.crs = dem.crs
+        # Metadata of the combined maps this session writes
+        self.meta = output_meta(config, self.height, self.width, self.transform, self.crs)
+
+        self.factor_risks = {}
+        self.thresholds = {}
+        self.index = np.zeros((self.height, self.width), dtype=np.uint8)
+
+    def matches(self, config):
+        """
+        True when config reads the same, unchanged inputs the same way, so this
+        session can evaluate it.
+        """
+        return (config.dem_file_path == self.dem_file_path
+                and config.rainfall_file_path == self.rainfall_file_path
+                and config.proximity_file_path == self.proximity_file_path
+                and config.compact == self.compact
+                and config.slope_method == self.slope_method
+                and config.resampling == self.resampling
+                and input_signature(config) == self.inputs)
+
+    def set_thresholds(self, factor, low, high):
+        """Reclassifies one factor if its thresholds changed. Returns True if it did."""
+        if self.thresholds.get(factor) == (low, high):
+            return False
+        classes = FACTOR_CLASSIFIERS[factor](self.layers[factor], low, high)
+        shift = FACTOR_SHIFTS[FACTORS.index(factor)]
+        # Replace this factor's two bits of the packed index in place
+        self.index &= np.uint8(~(3 << shift) & 0xFF)
+        self.index |= (classes & 3) << shift
+        self.factor_risks[factor] = classes
+        self.thresholds[factor] = (low, high)
+        return True
+
+    def update_thresholds(self, config):
+        """Brings every factor up to config's thresholds; returns the factors redone."""
+        if not self.matches(config):
+            raise ValueError("This session was built for different or since-changed input rasters; start a new one.")
+        changed = [factor for factor in FACTORS if self.set_thresholds(factor, *factor_thresholds(config, factor))]
+        if changed:
+            print(f"Reclassified: {', '.join(changed)}")
+        return changed
+
+    def evaluate(self, config):
+        """
+        Combined risk for config's weights and thresholds, redoing only the
+        factors whose thresholds changed since the last call.
+        """
+        self.update_thresholds(config)
+
+        combined_risk_map = config_lut(config)[self.index]
+        if config.save_file:
+            save_combined(config, combined_risk_map, self.transform)
+
+        return RiskModelResult(self.transform, self.height, self.width, save_file=config.save_file,
+                               combined_risk=combined_risk_map, slope=self.layers["slope"],
+                               factor_risks=dict(self.factor_risks))
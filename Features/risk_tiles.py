@@ -0,0 +1,210 @@
+"""
+XYZ map tiles (/tiles/{z}/{x}/{y}.png) rendered on demand from a risk GeoTIFF.
+
+Each tile is warped from the raster to its 256x256 Web Mercator grid with a
+small WarpedVRT, so only the overlapping window is read, from the overview
+level GDAL picks for the zoom (risk outputs are COGs with internal
+overviews). Classes are coloured through a 256-entry RGBA lookup table;
+nodata and pixels outside the raster are transparent. Rendered PNGs are kept
+in an in-memory LRU and on disk under .cache/tiles, keyed by the raster's
+path, size and mtime, so a rewritten risk map never serves stale tiles.
+A renderer can carry a version (map_service.py uses the raster's content
+hash); its tiles are then also served under /tiles/<version>/..., a URL that
+changes with the raster, so browsers may keep those tiles for good.
+
+    renderer = TileRenderer("combined_risk.tif", version=digest)
+    register_tile_routes(app, lambda: renderer)    # Flask
+    folium.TileLayer(tiles=tile_url(digest), ...)
+"""
+import io
+import os
+import sys
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+from PIL import Image
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "tiles")
+TILE_URL = "/tiles/{z}/{x}/{y}.png"
+VERSIONED_TILE_URL = "/tiles/{version}/{{z}}/{{x}}/{{y}}.png"
+TILE_SIZE = 256
+WEB_MERCATOR = "EPSG:3857"
+# Half the width of the Web Mercator world, in metres
+ORIGIN_SHIFT = 2 * math.pi * 6378137 / 2
+
+# Class colours of the old matplotlib overlay: 1 yellow, 2 orange, 3 red, 4 (No Data) gray
+RISK_COLORS = {1: (255, 255, 0), 2: (255, 165, 0), 3: (255, 0, 0), 4: (128, 128, 128)}
+
+
+def palette_lut(colors=RISK_COLORS, alpha=255):
+    """(256, 4) uint8 RGBA table; values without a colour are transparent."""
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    for value, rgb in colors.items():
+        lut[value] = (*rgb, alpha)
+    return lut
+
+
+def tile_url(version=None):
+    """Leaflet URL template of the risk tiles, versioned when version is given."""
+    return TILE_URL if version is None else VERSIONED_TILE_URL.format(version=version)
+
+
+def tile_bounds(z, x, y):
+    """(left, bottom, right, top) of an XYZ tile in Web Mercator metres."""
+    size = 2 * ORIGIN_SHIFT / 2 ** z
+    left = -ORIGIN_SHIFT + x * size
+    top = ORIGIN_SHIFT - y * size
+    return left, top - size, left + size, top
+
+
+class TileRenderer:
+    """Renders and caches PNG tiles for one risk raster."""
+
+    def __init__(self, risk_path, cache_dir=CACHE_DIR, memory_tiles=1024, colors=RISK_COLORS, version=None):
+        self.risk_path = os.path.abspath(risk_path)
+        # Identifies this raster's content in versioned tile URLs
+        self.version = version
+        self.lut = palette_lut(colors)
+        self.memory_tiles = memory_tiles
+        self._memory = OrderedDict()
+        # rasterio datasets are not thread-safe and Flask serves requests on threads
+        self._lock = threading.Lock()
+
+        self.cache_dir = self.cache_dir_for(risk_path, cache_dir, colors)
+        # Path, size, mtime and colours in one token, for tile ETags
+        self.signature = os.path.basename(self.cache_dir)
+
+        self.src = rasterio.open(self.risk_path)
+        self.nodata = self.src.nodata if self.src.nodata is not None else 0
+        self.mercator_bounds = transform_bounds(self.src.crs or "EPSG:4326", WEB_MERCATOR, *self.src.bounds)
+        self.empty_png = self.encode(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+    @staticmethod
+    def cache_dir_for(risk_path, cache_dir=CACHE_DIR, colors=RISK_COLORS):
+        """Disk cache directory for the raster's current path, size and mtime."""
+        risk_path = os.path.abspath(risk_path)
+        stat = os.stat(risk_path)
+        key = f"{risk_path}|{stat.st_size}|{stat.st_mtime_ns}|{sorted(colors.items())}"
+        return os.path.join(os.path.abspath(cache_dir), hashlib.sha256(key.encode()).hexdigest()[:16])
+
+    def close(self):
+        self.src.close()
+
+    def intersects(self, bounds):
+        left, bottom, right, top = self.mercator_bounds
+        return bounds[0] < right and bounds[2] > left and bounds[1] < top and bounds[3] > bottom
+
+    def render(self, z, x, y):
+        """RGBA array of a tile."""
+        left, bottom, right, top = tile_bounds(z, x, y)
+        transform = Affine((right - left) / TILE_SIZE, 0, left, 0, -(top - bottom) / TILE_SIZE, top)
+        with self._lock, WarpedVRT(self.src,
+                                   src_crs=self.src.crs or "EPSG:4326",
+                                   crs=WEB_MERCATOR,
+                                   transform=transform,
+                                   width=TILE_SIZE,
+                                   height=TILE_SIZE,
+                                   resampling=Resampling.nearest,
+                                   src_nodata=self.src.nodata,
+                                   nodata=self.nodata) as vrt:
+            classes = vrt.read(1)
+            mask = vrt.read_masks(1)
+        if np.issubdtype(classes.dtype, np.floating):
+            classes = np.nan_to_num(classes, nan=self.nodata)
+        rgba = self.lut[np.clip(classes, 0, 255).astype(np.uint8)]
+        rgba[mask == 0, 3] = 0
+        return rgba
+
+    @staticmethod
+    def encode(rgba):
+        buffer = io.BytesIO()
+        Image.fromarray(rgba, "RGBA").save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def tile(self, z, x, y):
+        """PNG bytes of a tile, from the memory LRU, the disk cache or a fresh render."""
+        if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise ValueError(f"Tile {z}/{x}/{y} is outside the world.")
+        key = (z, x, y)
+        with self._lock:
+            png = self._memory.get(key)
+            if png is not None:
+                self._memory.move_to_end(key)
+                return png
+
+        if not self.intersects(tile_bounds(z, x, y)):
+            return self.empty_png
+
+        path = os.path.join(self.cache_dir, str(z), str(x), f"{y}.png")
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+        except OSError:
+            png = self.encode(self.render(z, x, y))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a concurrent reader never sees half a file
+            partial = f"{path}.{threading.get_ident()}.part"
+            with open(partial, "wb") as f:
+                f.write(png)
+            os.replace(partial, path)
+
+        with self._lock:
+            self._memory[key] = png
+            if len(self._memory) > self.memory_tiles:
+                self._memory.popitem(last=False)
+        return png
+
+
+def register_tile_routes(app, get_renderer):
+    """
+    Adds /tiles/<z>/<x>/<y>.png and /tiles/<version>/<z>/<x>/<y>.png to a
+    Flask app. get_renderer returns the current TileRenderer, or None while
+    no risk map is loaded. A versioned URL only answers for the current
+    renderer's version and never changes, so it may be cached indefinitely;
+    the plain URL is revalidated on every use against an ETag taken from
+    the raster's signature.
+    """
+    from flask import Response, abort, request
+
+    def render(renderer, z, x, y):
+        if renderer is None:
+            abort(404)
+        try:
+            return renderer.tile(z, x, y)
+        except ValueError:
+            abort(404)
+
+    @app.route("/tiles/<int:z>/<int:x>/<int:y>.png")
+    def risk_tile(z, x, y):
+        renderer = get_renderer()
+        if renderer is None:
+            abort(404)
+        etag = f"{renderer.signature}-{z}-{x}-{y}"
+        headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+        if etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        return Response(render(renderer, z, x, y), mimetype="image/png", headers=headers)
+
+    @app.route("/tiles/<version>/<int:z>/<int:x>/<int:y>.png")
+    def versioned_risk_tile(version, z, x, y):
+        renderer = get_renderer()
+        if renderer is None or renderer.version != version:
+            abort(404)
+        png = render(renderer, z, x, y)
+        return Response(png, mimetype="image/png", headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print("Usage: python risk_tiles.py <risk_map.tif> <z> <x> <y>  (writes <z>_<x>_<y>.png)")
+        sys.exit(1)
+    z, x, y = (int(v) for v in sys.argv[2:])
+    with open(f"{z}_{x}_{y}.png", "wb") as f:
+        f.write(TileRenderer(sys.argv[1]).tile(z, x, y))
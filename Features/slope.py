@@ -1,26 +1,22 @@
 import sys
 import numpy as np
-from osgeo import gdal
+from osgeo import gdal, osr
+from affine import Affine
 from scipy.ndimage import gaussian_filter
 import matplotlib.pyplot as plt
+from classify import classify
+from cog import gdal_write_cog
+from terrain import fused_smooth_slope, terrain_derivatives
+from terrain_cache import TerrainCache
 
 def classify_slope(slope_data):
-    slope_risk = np.full_like(slope_data, np.nan, dtype=float)
-    slope_risk[(~np.isnan(slope_data)) & (slope_data < 30)] = 3  # High flood risk
-    slope_risk[(~np.isnan(slope_data)) & (slope_data >= 30) & (slope_data <= 50)] = 2  # Moderate
-    slope_risk[(~np.isnan(slope_data)) & (slope_data > 50)] = 1  # Low
+    # High flood risk below 30 degrees, moderate up to and including 50, low above
+    slope_risk = classify(slope_data, [30, 50], [3, 2, 1], nodata_code=0, right=[False, True]).astype(float)
+    slope_risk[slope_risk == 0] = np.nan
     return slope_risk
 
 def save_raster(output_path, array, geo, proj, nodata_val=np.nan):
-    driver = gdal.GetDriverByName('GTiff')
-    rows, cols = array.shape
-    out_raster = driver.Create(output_path, cols, rows, 1, gdal.GDT_Float32)
-    out_raster.SetGeoTransform(geo)
-    out_raster.SetProjection(proj)
-    out_band = out_raster.GetRasterBand(1)
-    out_band.WriteArray(array)
-    out_band.SetNoDataValue(nodata_val)
-    out_raster.FlushCache()
+    gdal_write_cog(output_path, array, geo, proj, nodata_val, gdal.GDT_Float32)
 
 def display_raster(array, title="Raster"):
     plt.imshow(array, cmap='terrain', interpolation='bilinear')
@@ -30,13 +26,16 @@ def display_raster(array, title="Raster"):
     plt.show()
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python slope.py <input_dem>  <output_path> <nodata_value>")
+    if len(sys.argv) not in (4, 5) or sys.argv[4:] not in ([], ["gradient"], ["fused"], ["horn"]):
+        print("Usage: python slope.py <input_dem>  <output_path> <nodata_value> [gradient|fused|horn]")
         sys.exit(1)
 
     dem_path = sys.argv[1]
     output_path = sys.argv[2]
     nodata_value = float(sys.argv[3])
+    # gradient: unit pixel spacing (original); fused: the same in one float32 pass;
+    # horn: true pixel sizes in metres
+    slope_method = sys.argv[4] if len(sys.argv) == 5 else "gradient"
 
     try:
         print("Loading DEM...")
@@ -45,18 +44,40 @@ if __name__ == "__main__":
             raise FileNotFoundError(f"DEM not found: {dem_path}")
 
         band = dataset.GetRasterBand(1)
-        dem = band.ReadAsArray().astype(float)
 
-        # Apply NoData mask
-        dem[dem == nodata_value] = np.nan
+        def compute_terrain():
+            dem = band.ReadAsArray().astype(float)
 
-        print("Applying Gaussian smoothing...")
-        smoothed = gaussian_filter(dem, sigma=1)
+            # Apply NoData mask
+            dem[dem == nodata_value] = np.nan
 
-        print("Calculating slope...")
-        x_grad, y_grad = np.gradient(smoothed)
-        slope = np.arctan(np.sqrt(x_grad**2 + y_grad**2)) * (180 / np.pi)
-        slope[np.isnan(dem)] = np.nan  # re-mask
+            if slope_method == "horn":
+                print("Calculating smoothed DEM and Horn slope...")
+                srs = osr.SpatialReference(wkt=dataset.GetProjection())
+                return terrain_derivatives(dem, Affine.from_gdal(*dataset.GetGeoTransform()),
+                                           bool(srs.IsGeographic()), sigma=1, layers=("smoothed", "slope"))
+
+            if slope_method == "fused":
+                print("Calculating smoothed DEM and slope in one pass...")
+                smoothed, slope = fused_smooth_slope(dem, sigma=1)
+                slope[np.isnan(dem)] = np.nan
+                return {"smoothed": smoothed, "slope": slope}
+
+            print("Applying Gaussian smoothing...")
+            smoothed = gaussian_filter(dem, sigma=1)
+
+            print("Calculating slope...")
+            x_grad, y_grad = np.gradient(smoothed)
+            slope = np.arctan(np.sqrt(x_grad**2 + y_grad**2)) * (180 / np.pi)
+            slope[np.isnan(dem)] = np.nan  # re-mask
+            return {"smoothed": smoothed, "slope": slope}
+
+        # Smoothing and slope only depend on the DEM and these settings, so
+        # repeated runs reuse them from the terrain cache
+        params = {"layers": ["smoothed", "slope"], "sigma": 1, "slope_method": slope_method,
+                  "mask": f"nodata={nodata_value}",
+                  "dtype": "float32" if slope_method == "fused" else "float64"}
+        slope = TerrainCache().get_or_compute(dem_path, params, compute_terrain)["slope"]
 
         print("Classifying slope into risk levels...")
         slope_risk = classify_slope(slope)
@@ -0,0 +1,179 @@
+"""
+On-disk cache for derived terrain layers (smoothed DEM, slope).
+
+Entries are keyed by the DEM's content hash and mtime plus the parameters
+that produced them (sigma, slope method, masking, dtype), stored as .npy files
+and memory-mapped on a hit. The least recently used entries are evicted once
+the cache grows past its size cap.
+
+    python terrain_cache.py info
+    python terrain_cache.py clear [dem_path]
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "terrain")
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+
+META_FILE = "meta.json"
+DIGESTS_FILE = "digests.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TerrainCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+
+    # ----- Keys -----
+    def _digests(self):
+        try:
+            with open(os.path.join(self.cache_dir, DIGESTS_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def source_digest(self, path):
+        """
+        Content hash of a source raster. Hashes are remembered per (size, mtime)
+        so an unchanged DEM is only read once.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        digests = self._digests()
+        known = digests.get(path)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha256"], stat.st_mtime_ns
+
+        sha = file_sha256(path)
+        digests[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._write_json(os.path.join(self.cache_dir, DIGESTS_FILE), digests)
+        return sha, stat.st_mtime_ns
+
+    def key(self, source_path, params):
+        sha, mtime_ns = self.source_digest(source_path)
+        blob = json.dumps({"sha256": sha, "mtime_ns": mtime_ns, "params": params}, sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+    # ----- Entries -----
+    def load(self, key, names):
+        """Memory-maps the named arrays of an entry, or returns None on a miss."""
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            arrays = {name: np.load(os.path.join(entry, name + ".npy"), mmap_mode="r") for name in names}
+            # The meta file's mtime is the entry's last use, for LRU eviction
+            os.utime(os.path.join(entry, META_FILE))
+        except (OSError, ValueError):
+            # Missing, or half removed by another process's eviction; entries only
+            # appear complete (store renames them into place), so drop the rest
+            # and let the caller store a fresh one
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        return arrays
+
+    def store(self, key, source_path, params, arrays):
+        """Writes an entry atomically, then evicts old entries past the size cap."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".tmp-", dir=self.cache_dir)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, name + ".npy"), np.ascontiguousarray(array))
+            self._write_json(os.path.join(staging, META_FILE),
+                             {"source": os.path.abspath(source_path), "params": params})
+            os.replace(staging, os.path.join(self.cache_dir, key))
+        except OSError:
+            # Another process stored the same entry first, or the disk is full;
+            # either way the caller already has the arrays in memory.
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def get_or_compute(self, source_path, params, compute):
+        """
+        Returns cached arrays for (source_path, params), memory-mapped read-only.
+        On a miss compute() must return a dict of arrays; they are stored and
+        returned as computed.
+        """
+        key = self.key(source_path, params)
+        arrays = self.load(key, params["layers"])
+        if arrays is not None:
+            print(f"Using cached terrain layers ({key})")
+            return arrays
+        arrays = compute()
+        self.store(key, source_path, params, arrays)
+        return arrays
+
+    # ----- Housekeeping -----
+    def entries(self):
+        """(path, last_used, size_bytes, meta) for every entry."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        found = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(entry, META_FILE)
+            if name.startswith(".") or not os.path.isfile(meta_path):
+                continue
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+                found.append((entry, os.path.getmtime(meta_path), size, meta))
+            except (OSError, ValueError):
+                # Being evicted by another process
+                continue
+        return found
+
+    def evict(self):
+        entries = sorted(self.entries(), key=lambda e: e[1])
+        total = sum(e[2] for e in entries)
+        for entry, _, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def invalidate(self, source_path=None):
+        """Drops every entry derived from source_path, or the whole cache."""
+        source = os.path.abspath(source_path) if source_path else None
+        removed = 0
+        for entry, _, _, meta in self.entries():
+            if source is None or meta["source"] == source:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        return removed
+
+    @staticmethod
+    def _write_json(path, data):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("info", "clear"):
+        print("Usage: python terrain_cache.py info | clear [dem_path]")
+        sys.exit(1)
+
+    cache = TerrainCache()
+    if sys.argv[1] == "info":
+        entries = cache.entries()
+        for entry, _, size, meta in entries:
+            print(f"{os.path.basename(entry)}  {size / 1024 ** 2:8.1f} MB  {meta['source']}  {meta['params']}")
+        print(f"{len(entries)} entries, {sum(e[2] for e in entries) / 1024 ** 2:.1f} MB in {cache.cache_dir}")
+    else:
+        removed = cache.invalidate(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"Removed {removed} cache entries")
@@ -0,0 +1,51 @@
+import math
+from rasterio.windows import Window
+
+
+def gaussian_halo(sigma, truncate=4.0):
+    """Pixels of context gaussian_filter needs on each side (same rule scipy uses)."""
+    return int(truncate * float(sigma) + 0.5)
+
+
+def tile_shape(src, tile_size=1024):
+    """
+    Picks a tile (rows, cols) that is a whole multiple of the raster's block size
+    and close to tile_size x tile_size pixels. Striped GeoTIFFs (one-row blocks
+    spanning the full width) get full-width strips of roughly the same area.
+    """
+    block_rows, block_cols = src.block_shapes[0]
+    if block_cols >= src.width:
+        cols = src.width
+        rows = max(block_rows, (tile_size * tile_size // max(cols, 1)) // block_rows * block_rows)
+    else:
+        rows = max(block_rows, tile_size // block_rows * block_rows)
+        cols = max(block_cols, tile_size // block_cols * block_cols)
+    return min(rows, src.height), min(cols, src.width)
+
+
+def iter_tiles(height, width, rows, cols):
+    """Yields core windows covering a height x width grid in row-major order."""
+    for row_off in range(0, height, rows):
+        for col_off in range(0, width, cols):
+            yield Window(col_off, row_off, min(cols, width - col_off), min(rows, height - row_off))
+
+
+def pad_window(window, halo, height, width):
+    """
+    Grows a core window by `halo` pixels on each side, clipped to the raster.
+    Returns the padded window and the (row, col) slices that cut the core back
+    out of an array read with it.
+    """
+    row_off, col_off = int(window.row_off), int(window.col_off)
+    top = max(row_off - halo, 0)
+    left = max(col_off - halo, 0)
+    bottom = min(row_off + int(window.height) + halo, height)
+    right = min(col_off + int(window.width) + halo, width)
+    padded = Window(left, top, right - left, bottom - top)
+    core = (slice(row_off - top, row_off - top + int(window.height)),
+            slice(col_off - left, col_off - left + int(window.width)))
+    return padded, core
+
+
+def tile_count(height, width, rows, cols):
+    return math.ceil(height / rows) * math.ceil(width / cols)
@@ -1,10 +1,34 @@
+import os
 import sys
 import numpy as np
-from PySide6.QtWidgets import QApplication, QDialog, QFileDialog,QColorDialog
-from PySide6.QtCore import Qt, QProcess
+from PySide6.QtWidgets import QApplication, QDialog, QFileDialog,QColorDialog, QComboBox, QLabel
+from PySide6.QtCore import Qt, QThread, Signal
 from FRIZ_ui import Ui_Dialog  # Your converted UI file
 from PySide6.QtGui import QColor
 
+# The risk engine lives next to the other feature scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Features"))
+from risk_model import RiskModelConfig
+from risk_session import RiskSession
+from ahp import ahp_weights as compute_ahp_weights
+
+
+class RiskModelWorker(QThread):
+    """Runs a risk model job off the GUI thread so the dialog stays responsive."""
+    succeeded = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        self.job = job
+
+    def run(self):
+        try:
+            self.succeeded.emit(self.job())
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
 class FileInputDialog(QDialog, Ui_Dialog):
     def select_color_and_update_line_edit(self, line_edit):
     # Open a color dialog and get the selected color
@@ -23,6 +47,15 @@ class FileInputDialog(QDialog, Ui_Dialog):
         self.toolButton_2.clicked.connect(lambda: self.select_file(self.lineEdit_2))
         self.toolButton_3.clicked.connect(lambda: self.select_file(self.lineEdit_3))
 
+        # Slope method selector, below the input files
+        self.label_slope_method = QLabel("Slope Method", self.groupBox)
+        self.comboBox_slope_method = QComboBox(self.groupBox)
+        self.comboBox_slope_method.addItem("Original (np.gradient)", "gradient")
+        self.comboBox_slope_method.addItem("Fast single pass (same result, float32)", "fused")
+        self.comboBox_slope_method.addItem("Horn, true pixel size", "horn")
+        self.verticalLayout.addWidget(self.label_slope_method)
+        self.verticalLayout.addWidget(self.comboBox_slope_method)
+
         # Assume you want these default hex values: 
         self.lineEdit_4.setText("#FF0000")
         self.lineEdit_5.setText("#FFA500")
@@ -39,10 +72,12 @@ class FileInputDialog(QDialog, Ui_Dialog):
         # Connect the AHP calculation button to update the weight boxes
         self.pushButton_2.clicked.connect(self.calculate_ahp)
         
-        # Connect the Run button to execute the external script
+        # Connect the Run button to execute the risk model
         self.pushButton.clicked.connect(self.run_script)
         
-        self.process = None
+        self.worker = None
+        # Keeps the classified layers of the current inputs between runs
+        self.session = None
 
     def select_file(self, line_edit):
         """Opens a file dialog and sets the selected file path into the given QLineEdit."""
@@ -69,20 +104,7 @@ class FileInputDialog(QDialog, Ui_Dialog):
                 else:
                     A[i, j] = 1.0
 
-        eigenvalues, eigenvectors = np.linalg.eig(A)
-        max_index = np.argmax(eigenvalues.real)
-        principal_eigenvector = eigenvectors[:, max_index].real
-        ahp_weights = principal_eigenvector / np.sum(principal_eigenvector)
-
-        # Calculate consistency ratio (CR)
-        lambda_max = eigenvalues[max_index].real
-        CI = (lambda_max - n) / (n - 1) if n > 1 else 0.0
-        RI_dict = {1: 0.0, 2: 0.0, 3: 0.58, 4: 0.90, 5: 1.12,
-                   6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45, 10: 1.49}
-        RI = RI_dict.get(n, 1.49)
-        CR = CI / RI if RI != 0 else 0.0
-
-        return ahp_weights, CR
+        return compute_ahp_weights(A)
     def select_save_file(self, line_edit):
         """Opens a save file dialog and sets the selected output file path into the given QLineEdit."""
         file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "TIFF Files (*.tif);;All Files (*.*)")
@@ -109,57 +131,60 @@ class FileInputDialog(QDialog, Ui_Dialog):
           - File paths from QLineEdits (DEM, Rainfall, Proximity)
           - AHP weights from the corresponding double spin boxes
           - Middle range values from the lower/upper limit spin boxes in groupBox_4
-        Then starts the external script (slopeelerainprox.py) via QProcess,
-        passing all these values as command-line arguments.
+        Then runs the risk model in-process on a worker thread and plots the
+        result when it finishes. While the input files stay the same, the
+        session only redoes the factors whose thresholds changed and the
+        weight lookup, so re-runs take well under a second.
         """
-        # File paths
-        Dem = self.lineEdit.text()
-        Rainfall = self.lineEdit_2.text()
-        Proximity = self.lineEdit_3.text()
-        # AHP weight values
-        elevation_weight = str(self.doubleSpinBox_weigh_1.value())
-        slope_weight = str(self.doubleSpinBox_weigh_2.value())
-        proximity_weight = str(self.doubleSpinBox_weigh_3.value())
-        rainfall_weight = str(self.doubleSpinBox_weigh_4.value())
-        # Middle range values (from groupBox_4)
-        middle_lower_elev = str(self.doubleSpinBox_low_1.value())
-        middle_upper_elev = str(self.doubleSpinBox_upp_1.value())
-        middle_lower_slope = str(self.doubleSpinBox_low_2.value())
-        middle_upper_slope = str(self.doubleSpinBox_upp_2.value())
-        middle_lower_rain = str(self.doubleSpinBox_low_3.value())
-        middle_upper_rain = str(self.doubleSpinBox_upp_3.value())
-        middle_lower_prox = str(self.doubleSpinBox_low_4.value())
-        middle_upper_prox = str(self.doubleSpinBox_upp_4.value())
+        if self.worker is not None and self.worker.isRunning():
+            print("A risk model run is already in progress.")
+            return
+
+        config = RiskModelConfig(
+            # File paths
+            dem_file_path=self.lineEdit.text(),
+            rainfall_file_path=self.lineEdit_2.text(),
+            proximity_file_path=self.lineEdit_3.text(),
+            # AHP weight values
+            elevation_weight=self.doubleSpinBox_weigh_1.value(),
+            slope_weight=self.doubleSpinBox_weigh_2.value(),
+            proximity_weight=self.doubleSpinBox_weigh_3.value(),
+            rainfall_weight=self.doubleSpinBox_weigh_4.value(),
+            # Middle range values (from groupBox_4)
+            elevation_low=self.doubleSpinBox_low_1.value(),
+            elevation_high=self.doubleSpinBox_upp_1.value(),
+            slope_low=self.doubleSpinBox_low_2.value(),
+            slope_high=self.doubleSpinBox_upp_2.value(),
+            rainfall_low=self.doubleSpinBox_low_3.value(),
+            rainfall_high=self.doubleSpinBox_upp_3.value(),
+            proximity_low=self.doubleSpinBox_low_4.value(),
+            proximity_high=self.doubleSpinBox_upp_4.value(),
+            # Save file path
+            save_file=self.lineEdit_7.text() or None,
+            slope_method=self.comboBox_slope_method.currentData(),
+        )
+
+        def evaluate():
+            if self.session is None or not self.session.matches(config):
+                self.session = RiskSession(config)
+            return self.session.evaluate(config)
+
+        self.worker = RiskModelWorker(evaluate, self)
+        self.worker.succeeded.connect(self.show_result)
+        self.worker.failed.connect(lambda message: print(f"Risk model failed: {message}"))
+        self.worker.start()
+
+    def show_result(self, result):
+        """Plots the finished run with the class colours picked in the dialog."""
+        import matplotlib.pyplot as plt
+        from slopeelerainprox import plot_risk_maps
 
         # Color of classes
         High = self.lineEdit_4.text()
         Medium = self.lineEdit_5.text()
         Low = self.lineEdit_6.text()
-
-        # Save file path
-        save_file = self.lineEdit_7.text()
-        # Create and configure QProcess
-        self.process = QProcess(self)
-        self.process.readyReadStandardOutput.connect(
-            lambda: print(self.process.readAllStandardOutput().data().decode())
-        )
-        self.process.readyReadStandardError.connect(
-            lambda: print(self.process.readAllStandardError().data().decode())
-        )
-        script_path = r"./Features/slopeelerainprox.py"
-        # Build the argument list. Adjust the order as required by your external script.
-        args = [
-            script_path,
-            Dem, Rainfall, Proximity,
-            elevation_weight, slope_weight, proximity_weight, rainfall_weight,
-            middle_lower_elev, middle_upper_elev,
-            middle_lower_slope, middle_upper_slope,
-            middle_lower_rain, middle_upper_rain,
-            middle_lower_prox, middle_upper_prox,
-            High, Medium, Low,
-            save_file
-        ]
-        self.process.start(sys.executable, args)
+        plot_risk_maps(result, High, Medium, Low)
+        plt.show(block=False)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
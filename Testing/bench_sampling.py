@@ -0,0 +1,65 @@
+"""
+Benchmarks vectorized risk sampling against the per-node loop the OSM map
+scripts used.
+
+Usage: python bench_sampling.py [risk.tif] [--points 100000] [--radius 0]
+
+Without a risk map a synthetic 4000 x 4000 class raster is used.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from affine import Affine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Features"))
+from risk_sampling import sample_risk
+
+
+def per_node_loop(points, risk_data, transform):
+    inv_affine = ~transform
+    risks = []
+    for lon, lat in points:
+        col, row = inv_affine * (lon, lat)
+        col, row = int(col // 1), int(row // 1)
+        if row < 0 or row >= risk_data.shape[0] or col < 0 or col >= risk_data.shape[1]:
+            risks.append(np.nan)
+            continue
+        risks.append(risk_data[row, col])
+    return np.array(risks, dtype=np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("risk_map", nargs="?")
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--radius", type=float, default=0)
+    args = parser.parse_args(sys.argv[1:])
+
+    if args.risk_map:
+        import rasterio
+        with rasterio.open(args.risk_map) as src:
+            risk_data, transform = src.read(1), src.transform
+    else:
+        rng = np.random.default_rng(0)
+        risk_data = rng.integers(1, 4, (4000, 4000)).astype(np.float32)
+        transform = Affine(0.0001, 0, 73.5, 0, -0.0001, 19.0)
+
+    rng = np.random.default_rng(1)
+    height, width = risk_data.shape
+    left, top = transform * (0, 0)
+    right, bottom = transform * (width, height)
+    points = np.column_stack((rng.uniform(left, right, args.points), rng.uniform(bottom, top, args.points)))
+
+    start = time.perf_counter()
+    expected = per_node_loop(points, risk_data, transform)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = sample_risk(points, risk_data, transform, radius=args.radius)
+    vector_time = time.perf_counter() - start
+
+    print(f"{args.points} points: loop {loop_time:.3f} s, sample_risk {vector_time:.4f} s "
+          f"({loop_time / vector_time:.0f}x)")
+    print(f"Same classes: {np.array_equal(expected, table['risk'], equal_nan=True)}")
@@ -0,0 +1,67 @@
+"""
+Benchmarks the fused smoothing + slope kernel against the original
+gaussian_filter + np.gradient chain.
+
+Usage: python bench_terrain.py [dem.tif] [--size 4000] [--repeat 3]
+
+Without a DEM a synthetic surface of --size x --size pixels is used.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Features"))
+from terrain import HAVE_NUMBA, fused_smooth_slope
+
+
+def original_chain(dem):
+    smoothed = gaussian_filter(dem, sigma=1)
+    x_gradient, y_gradient = np.gradient(smoothed)
+    slope = np.arctan(np.sqrt(x_gradient**2 + y_gradient**2)) * (180 / np.pi)
+    return smoothed, slope
+
+
+def synthetic_dem(size, seed=0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    return 500 + 300 * np.sin(6 * x) * np.cos(4 * y) + rng.normal(0, 2, (size, size))
+
+
+def best_time(func, dem, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(dem)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fused terrain kernel benchmark.")
+    parser.add_argument("dem", nargs="?")
+    parser.add_argument("--size", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.dem:
+        import rasterio
+        with rasterio.open(args.dem) as src:
+            dem = src.read(1).astype(float)
+        dem[dem < 0] = np.nan
+    else:
+        dem = synthetic_dem(args.size)
+    print(f"DEM {dem.shape[0]}x{dem.shape[1]}, numba {'available' if HAVE_NUMBA else 'not installed (NumPy fallback)'}")
+
+    # The first call compiles the kernel (or loads it from numba's cache)
+    fused_smooth_slope(dem[:64, :64])
+
+    original_time, (smoothed, slope) = best_time(original_chain, dem, args.repeat)
+    fused_time, (fused_smoothed, fused_slope) = best_time(fused_smooth_slope, dem, args.repeat)
+
+    print(f"gaussian_filter + np.gradient: {original_time:.3f} s")
+    print(f"fused kernel:                  {fused_time:.3f} s  ({original_time / fused_time:.1f}x)")
+    print(f"max |smoothed difference|: {np.nanmax(np.abs(fused_smoothed - smoothed)):.2e}")
+    print(f"max |slope difference|:    {np.nanmax(np.abs(fused_slope - slope)):.2e} degrees")
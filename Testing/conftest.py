@@ -0,0 +1,55 @@
+"""Shared fixtures for the pytest checks in Testing/; the Features modules use flat imports."""
+import os
+import sys
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Features"))
+from risk_model import RiskModelConfig
+
+GRID = {"height": 60, "width": 80, "crs": "EPSG:4326", "transform": from_origin(73.5, 19.0, 0.0003, 0.0003)}
+
+
+def write_raster(path, data, nodata=None, **grid):
+    """Writes one float32 band on GRID (or the given grid) and returns the path."""
+    grid = dict(GRID, **grid)
+    with rasterio.open(path, "w", driver="GTiff", count=1, dtype="float32", nodata=nodata, **grid) as dst:
+        dst.write(data.astype(np.float32), 1)
+    return str(path)
+
+
+def make_config(dem, rain, prox, **options):
+    """RiskModelConfig with the sample weights and thresholds, without the terrain cache."""
+    return RiskModelConfig(dem, rain, prox, 0.2, 0.3, 0.2, 0.3, 300, 600, 1, 5, 20, 25, 0.3, 0.6,
+                           terrain_cache=False, **options)
+
+
+def write_risk(path, value):
+    """Writes a uint8 risk map of one class on GRID (nodata 0) and returns the path."""
+    with rasterio.open(path, "w", driver="GTiff", count=1, dtype="uint8", nodata=0, **GRID) as dst:
+        dst.write(np.full((GRID["height"], GRID["width"]), value, dtype=np.uint8), 1)
+    return str(path)
+
+
+def covering_tile():
+    """An XYZ tile over the middle of GRID."""
+    lon = GRID["transform"].c + GRID["transform"].a * GRID["width"] / 2
+    lat = GRID["transform"].f + GRID["transform"].e * GRID["height"] / 2
+    z = 12
+    x = int((lon + 180) / 360 * 2 ** z)
+    y = int((1 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2 * 2 ** z)
+    return z, x, y
+
+
+@pytest.fixture
+def risk_inputs(tmp_path):
+    """Small DEM, rainfall and proximity rasters on one grid."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:GRID["height"], 0:GRID["width"]]
+    dem = 500 + 200 * np.sin(x / 10) * np.cos(y / 8) + rng.normal(0, 5, y.shape)
+    rain = 20 + 10 * np.sin(x / 15) + rng.normal(0, 2, y.shape)
+    prox = rng.random(y.shape) * 5000
+    return (write_raster(tmp_path / "dem.tif", dem), write_raster(tmp_path / "rain.tif", rain),
+            write_raster(tmp_path / "prox.tif", prox))
@@ -0,0 +1,42 @@
+import numpy as np
+import rasterio
+from conftest import GRID, write_raster
+from align import AlignedRaster
+from risk_model import NO_DATA_CLASS, classify_rainfall, prepare_rainfall
+from rasterio.transform import from_origin
+
+
+def test_matching_grid_nodata_reads_as_nan(tmp_path, risk_inputs):
+    dem = risk_inputs[0]
+    data = np.full((GRID["height"], GRID["width"]), 25.0)
+    data[10:20, 30:40] = -9999
+    rain = write_raster(tmp_path / "rain_nodata.tif", data, nodata=-9999)
+
+    with rasterio.open(dem) as reference, AlignedRaster(rain, reference) as src:
+        assert not src.warped
+        values = src.read(1)
+    assert np.isnan(values[10:20, 30:40]).all()
+    assert (values[~np.isnan(values)] == 25).all()
+    # Nodata stays No Data through the rainfall factor instead of becoming 0 mm
+    classes = classify_rainfall(prepare_rainfall(values.astype(float)), 20, 25)
+    assert (classes[10:20, 30:40] == NO_DATA_CLASS).all()
+
+
+def test_nodata_is_nan_on_both_alignment_paths(tmp_path, risk_inputs):
+    dem = risk_inputs[0]
+    data = np.full((GRID["height"], GRID["width"]), 25.0)
+    data[:, :40] = -9999
+    same = write_raster(tmp_path / "same.tif", data, nodata=-9999)
+    # Same pixels, but half a pixel off the reference grid, so it has to be warped
+    shifted = write_raster(tmp_path / "shifted.tif", data, nodata=-9999,
+                           transform=from_origin(73.5 + 0.00015, 19.0, 0.0003, 0.0003))
+
+    with rasterio.open(dem) as reference:
+        with AlignedRaster(same, reference, "nearest") as src:
+            direct = src.read(1)
+        with AlignedRaster(shifted, reference, "nearest") as src:
+            assert src.warped
+            warped = src.read(1)
+    # Away from the nodata edge both paths agree, NaN included
+    np.testing.assert_array_equal(direct[:, :38], warped[:, :38])
+    np.testing.assert_array_equal(direct[:, 42:], warped[:, 42:])
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from conftest import GRID, write_raster
+
+pytest.importorskip("osgeo")
+from clipping import clip_to_raster_footprint
+
+
+@pytest.mark.parametrize("nodata", [np.nan, -9999.0])
+def test_extent_nodata_is_masked(tmp_path, nodata):
+    extent = np.ones((GRID["height"], GRID["width"]))
+    extent[:10, :20] = nodata
+    extent_path = write_raster(tmp_path / "extent.tif", extent, nodata=nodata)
+    raster_path = write_raster(tmp_path / "rain.tif", np.full(extent.shape, 20.0))
+
+    data, _, _ = clip_to_raster_footprint(raster_path, extent_path)
+    assert np.isnan(data[:10, :20]).all()
+    assert not np.isnan(data[10:]).any()
@@ -0,0 +1,56 @@
+from dataclasses import replace
+import numpy as np
+import rasterio
+from conftest import GRID, make_config, write_raster
+from risk_model import COMPACT_NODATA, NO_DATA_CLASS, RiskModelConfig, run_risk_model
+from risk_session import RiskSession
+
+
+def run(dem, rain, prox, tmp_path, compact):
+    save_file = str(tmp_path / f"risk_{compact}.tif")
+    result = run_risk_model(make_config(dem, rain, prox, save_file=save_file, compact=compact))
+    with rasterio.open(save_file) as src:
+        return result, src.read(1), src.nodata
+
+
+def test_compact_keeps_classes_and_writes_no_data_as_zero(tmp_path, risk_inputs):
+    _, _, prox = risk_inputs
+    # Negative elevations are No Data; with missing rainfall too the combined class is 4
+    with rasterio.open(risk_inputs[0]) as src:
+        elevation = src.read(1)
+    elevation[:5] = -1
+    dem = write_raster(tmp_path / "dem_gap.tif", elevation)
+    # Just below the rainfall threshold in float64, but exactly on it once rounded to float32
+    rain = str(tmp_path / "rain64.tif")
+    with rasterio.open(rain, "w", driver="GTiff", count=1, dtype="float64", **GRID) as dst:
+        data = np.full((GRID["height"], GRID["width"]), 25 - 1e-9)
+        data[:5] = np.nan
+        dst.write(data, 1)
+
+    full, full_data, full_nodata = run(dem, rain, prox, tmp_path, compact=False)
+    compact, compact_data, compact_nodata = run(dem, rain, prox, tmp_path, compact=True)
+
+    for factor, classes in full.factor_risks.items():
+        assert np.array_equal(classes, compact.factor_risks[factor]), factor
+    assert (full_nodata, compact_nodata) == (NO_DATA_CLASS, COMPACT_NODATA)
+    assert compact_data.dtype == np.uint8
+    assert NO_DATA_CLASS in full_data and NO_DATA_CLASS not in compact_data
+    assert np.array_equal(np.where(full_data == NO_DATA_CLASS, COMPACT_NODATA, full_data), compact_data)
+
+
+def test_compact_keeps_float32_rainfall_in_float32(tmp_path, risk_inputs):
+    dem, _, prox = risk_inputs
+    rain = np.full((GRID["height"], GRID["width"]), 25.0, dtype=np.float32)
+    rain[:, :40] = np.nextafter(np.float32(25), np.float32(0))
+    rain_path = write_raster(tmp_path / "rain32.tif", rain)
+    # 25.00000001 rounds to 25.0 in float32; the float64 comparison keeps 25.0 below it
+    config = RiskModelConfig(dem, rain_path, prox, 0.2, 0.3, 0.2, 0.3, 300, 600, 1, 5, 20, 25.00000001, 0.3, 0.6,
+                             terrain_cache=False)
+    compact_config = replace(config, compact=True)
+    full, compact = RiskSession(config), RiskSession(compact_config)
+
+    assert (full.layers["rainfall"].dtype, compact.layers["rainfall"].dtype) == (np.float64, np.float32)
+    full.update_thresholds(config)
+    compact.update_thresholds(compact_config)
+    assert (compact.factor_risks["rainfall"] == 2).all()
+    assert np.array_equal(full.index, compact.index)
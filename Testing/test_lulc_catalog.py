@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+import rasterio
+from conftest import GRID
+from lulc_catalog import build_catalog
+
+
+def write_ids(path, ids, nodata):
+    with rasterio.open(path, "w", driver="GTiff", count=1, dtype="int16", nodata=nodata, **GRID) as dst:
+        dst.write(ids, 1)
+    return str(path)
+
+
+def test_id_band_nodata_is_skipped(tmp_path):
+    ids = np.full((GRID["height"], GRID["width"]), -9999, dtype=np.int16)
+    ids[5:10, 20:30] = 2
+    ids[40:, :3] = 7
+    catalog = build_catalog(write_ids(tmp_path / "ids.tif", ids, -9999), rows_per_strip=16)
+    assert [(c["id"], c["count"], c["bbox"]) for c in catalog["classes"]] == [
+        (2, 50, {"row_min": 5, "row_max": 9, "col_min": 20, "col_max": 29}),
+        (7, 60, {"row_min": 40, "row_max": 59, "col_min": 0, "col_max": 2}),
+    ]
+
+
+def test_negative_ids_are_rejected(tmp_path):
+    ids = np.ones((GRID["height"], GRID["width"]), dtype=np.int16)
+    ids[30, 30] = -1
+    with pytest.raises(ValueError, match="negative"):
+        build_catalog(write_ids(tmp_path / "ids.tif", ids, None))
@@ -0,0 +1,33 @@
+import json
+import numpy as np
+import pytest
+import rasterio
+from conftest import GRID
+from poi_store import OfflineOverpass, POIStore
+
+pytest.importorskip("folium")
+from map_builder import build_map
+
+
+@pytest.mark.parametrize("dtype,nodata", [("float32", 4), ("uint8", 0)])
+def test_hospitals_on_nodata_are_dropped(tmp_path, dtype, nodata):
+    # Left half No Data, right half high risk
+    risk = np.full((GRID["height"], GRID["width"]), 3, dtype=dtype)
+    risk[:, :40] = nodata
+    risk_path = str(tmp_path / "risk.tif")
+    with rasterio.open(risk_path, "w", driver="GTiff", count=1, dtype=dtype, nodata=nodata, **GRID) as dst:
+        dst.write(risk, 1)
+
+    west, north = GRID["transform"].c, GRID["transform"].f
+    size = GRID["transform"].a
+    pois = tmp_path / "pois.geojson"
+    pois.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "id": f"node/{osm_id}", "properties": {"amenity": "hospital"},
+         "geometry": {"type": "Point", "coordinates": [west + col * size, north - 30.5 * size]}}
+        for osm_id, col in ((1, 10.5), (2, 60.5))]}))
+
+    with POIStore(str(tmp_path / "pois.sqlite")) as store:
+        store.import_file(str(pois))
+        _, layers = build_map(risk_path, ("hospital",), OfflineOverpass(store), layer_url=None)
+    features = layers["hospital"]["features"]
+    assert [(f["id"], f["properties"]["risk"]) for f in features] == [(2, 3)]
@@ -0,0 +1,41 @@
+import re
+import pytest
+from conftest import covering_tile, write_risk
+
+pytest.importorskip("flask")
+pytest.importorskip("folium")
+from map_service import MapService
+
+
+@pytest.fixture
+def service(tmp_path):
+    # No POI layers are published, so the api is never queried
+    service = MapService(api=object(), tile_cache_dir=str(tmp_path / "tiles"))
+    yield service
+    if service.tile_renderer is not None:
+        service.tile_renderer.close()
+
+
+def page_tile_url(client):
+    html = client.get("/").get_data(as_text=True)
+    return re.search(r'"(/tiles/[0-9a-f]+)/\{z\}/\{x\}/\{y\}\.png"', html).group(1)
+
+
+def test_republishing_changes_the_tile_urls(tmp_path, service):
+    client = service.app.test_client()
+    z, x, y = covering_tile()
+
+    service.publish(write_risk(tmp_path / "low.tif", 1), ())
+    first = page_tile_url(client)
+    first_tile = client.get(f"{first}/{z}/{x}/{y}.png")
+    assert first_tile.status_code == 200
+    assert "immutable" in first_tile.headers["Cache-Control"]
+
+    service.publish(write_risk(tmp_path / "high.tif", 3), ())
+    second = page_tile_url(client)
+    assert second != first
+    second_tile = client.get(f"{second}/{z}/{x}/{y}.png")
+    assert second_tile.status_code == 200
+    assert second_tile.data != first_tile.data
+    # The old map's tiles are no longer served under its version
+    assert client.get(f"{first}/{z}/{x}/{y}.png").status_code == 404
@@ -0,0 +1,65 @@
+import json
+import sqlite3
+import threading
+import pytest
+from poi_store import OfflineOverpass, POIStore, overpass_api
+
+FEATURES = [
+    ("node/1", 18.50, 73.80, {"amenity": "hospital", "name": "General"}),
+    ("node/2", 18.52, 73.82, {"amenity": "school", "name": "Primary"}),
+    ("node/3", 18.55, 73.85, {"emergency": "fire_station"}),
+    # On the query box edges: south-west corner and the north edge
+    ("node/4", 18.40, 73.70, {"amenity": "hospital", "name": "Corner"}),
+    ("node/5", 18.60, 73.90, {"amenity": "hospital", "name": "North"}),
+    # Just outside the box
+    ("node/6", 18.3999, 73.80, {"amenity": "hospital", "name": "Outside"}),
+]
+BBOX = "18.4,73.7,18.6,73.9"
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "pois.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "id": osm_id, "properties": tags, "geometry": {"type": "Point", "coordinates": [lon, lat]}}
+        for osm_id, lat, lon, tags in FEATURES]}))
+    with POIStore(str(tmp_path / "pois.sqlite")) as store:
+        store.import_file(str(path))
+        yield store
+
+
+def node_ids(result):
+    return sorted(node.id for node in result.nodes)
+
+
+def test_parse_filters_and_bbox():
+    assert OfflineOverpass.parse(f'node["amenity"="hospital"]({BBOX});out;') == \
+        ((18.4, 73.7, 18.6, 73.9), {"amenity": "hospital"})
+    assert OfflineOverpass.parse(f'node["emergency"]["name"="x"]({BBOX});out;')[1] == {"emergency": None, "name": "x"}
+    with pytest.raises(ValueError):
+        OfflineOverpass.parse(f'way["amenity"]({BBOX});out;')
+
+
+def test_query_key_value_filter_keeps_bbox_edges(store):
+    result = OfflineOverpass(store).query(f'node["amenity"="hospital"]({BBOX});out;')
+    assert node_ids(result) == [1, 4, 5]
+    assert {node.tags["name"] for node in result.nodes} == {"General", "Corner", "North"}
+
+
+def test_query_key_only_filter(store):
+    api = OfflineOverpass(store)
+    assert node_ids(api.query(f'node["emergency"]({BBOX});out;')) == [3]
+    assert node_ids(api.query(f'node["amenity"]({BBOX});out;')) == [1, 2, 4, 5]
+
+
+def test_overpass_api_closes_store_and_works_across_threads(store):
+    store.close()
+    results = []
+    with overpass_api(store.db_path) as api:
+        # Flask builds maps on its request threads
+        thread = threading.Thread(target=lambda: results.append(api.query(f'node["amenity"="school"]({BBOX});out;')))
+        thread.start()
+        thread.join()
+    assert node_ids(results[0]) == [2]
+    with pytest.raises(sqlite3.ProgrammingError):
+        api.store.count()
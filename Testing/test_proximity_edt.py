@@ -0,0 +1,22 @@
+import numpy as np
+from proximity_edt import proximity_array
+from risk_model import classify_proximity
+
+
+def test_capped_distances_equal_clamped_full_transform():
+    rng = np.random.default_rng(0)
+    classes = np.zeros((120, 90), dtype=np.uint8)
+    classes[rng.integers(20, 40, 5), rng.integers(10, 30, 5)] = 7
+    for cap in (15.0, 100.0, 1e6):
+        full = proximity_array(classes, [7], (10.0, 12.5))
+        capped = proximity_array(classes, [7], (10.0, 12.5), cap)
+        assert np.array_equal(capped, np.minimum(full, np.float32(cap)))
+
+
+def test_no_targets_means_far_not_nodata():
+    classes = np.zeros((10, 12), dtype=np.uint8)
+    distance = proximity_array(classes, [7], (10.0, 10.0))
+    assert np.isposinf(distance).all()
+    # Far from water is low risk, not No Data
+    assert (classify_proximity(distance, 0.3, 0.6) == 1).all()
+    assert (proximity_array(classes, [7], (10.0, 10.0), 250.0) == 250).all()
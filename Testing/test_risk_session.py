@@ -0,0 +1,28 @@
+import os
+import numpy as np
+from conftest import make_config, write_raster
+from risk_session import RiskSession
+
+
+def test_session_is_rebuilt_when_an_input_is_rewritten(risk_inputs):
+    dem, rain, prox = risk_inputs
+    config = make_config(dem, rain, prox)
+    session = RiskSession(config)
+    before = session.evaluate(config).combined_risk.copy()
+    assert session.matches(config)
+
+    # Rewrite the rainfall with much wetter values; keep the mtime distinguishable
+    stat = os.stat(rain)
+    write_raster(rain, np.full((60, 80), 500.0))
+    os.utime(rain, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not session.matches(config)
+
+    after = RiskSession(config).evaluate(config).combined_risk
+    assert not np.array_equal(before, after)
+
+
+def test_session_does_not_match_other_resampling(risk_inputs):
+    config = make_config(*risk_inputs)
+    session = RiskSession(config)
+    config.resampling = "nearest"
+    assert not session.matches(config)
@@ -0,0 +1,28 @@
+import os
+import pytest
+from conftest import covering_tile, write_risk
+
+flask = pytest.importorskip("flask")
+from risk_tiles import TileRenderer, register_tile_routes
+
+
+def test_plain_tile_urls_revalidate_against_the_raster(tmp_path):
+    risk_path = write_risk(tmp_path / "risk.tif", 1)
+    renderers = [TileRenderer(risk_path, str(tmp_path / "tiles"))]
+    app = flask.Flask(__name__)
+    register_tile_routes(app, lambda: renderers[-1])
+    client = app.test_client()
+    url = "/tiles/{}/{}/{}.png".format(*covering_tile())
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    # A rewritten raster gets a new ETag, so the browser's copy is replaced
+    renderers[-1].close()
+    write_risk(risk_path, 3)
+    os.utime(risk_path, ns=(1, 1))
+    renderers.append(TileRenderer(risk_path, str(tmp_path / "tiles")))
+    second = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200 and second.data != first.data
+    renderers[-1].close()
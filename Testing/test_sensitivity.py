@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from conftest import make_config
+from risk_model import build_risk_lut
+from risk_session import RiskSession
+from sensitivity import build_risk_luts, dirichlet_weights, run_sensitivity
+
+
+def test_luts_match_build_risk_lut():
+    weights = dirichlet_weights([0.2, 0.3, 0.2, 0.3], 50, rng=1)
+    luts = build_risk_luts(weights)
+    for (elevation, slope, proximity, rainfall), lut in zip(weights, luts):
+        assert np.array_equal(lut, build_risk_lut(slope, rainfall, elevation, proximity))
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_frequencies_cover_every_scenario(risk_inputs, compact):
+    config = make_config(*risk_inputs, compact=compact)
+    # Weights far from the base ones, so some inputs combine to No Data
+    weights = dirichlet_weights([0.25, 0.25, 0.25, 0.25], 200, concentration=1.0, rng=2)
+    classes, table, _ = run_sensitivity(RiskSession(config), config, weights)
+    assert classes[-1] == (0 if compact else 4)
+    assert np.allclose(table.sum(axis=1), 1)
@@ -0,0 +1,28 @@
+import os
+import numpy as np
+from conftest import write_raster
+from terrain_cache import META_FILE, TerrainCache
+
+PARAMS = {"layers": ["slope"], "sigma": 1}
+
+
+def test_entry_without_meta_file_is_a_miss(tmp_path):
+    dem = write_raster(tmp_path / "dem.tif", np.ones((60, 80)))
+    cache = TerrainCache(str(tmp_path / "cache"))
+    computed = []
+
+    def compute():
+        computed.append(True)
+        return {"slope": np.arange(6.0).reshape(2, 3)}
+
+    cache.get_or_compute(dem, PARAMS, compute)
+    key = cache.key(dem, PARAMS)
+    assert cache.load(key, ["slope"]) is not None
+
+    # As if another process evicted the entry between the array load and the LRU touch
+    os.remove(os.path.join(cache.cache_dir, key, META_FILE))
+    assert cache.load(key, ["slope"]) is None
+    assert np.array_equal(cache.get_or_compute(dem, PARAMS, compute)["slope"], np.arange(6.0).reshape(2, 3))
+    assert len(computed) == 2
+    # The broken entry was replaced by a fresh one
+    assert cache.load(key, ["slope"]) is not None
@@ -1,8 +1,12 @@
 import numpy as np
 from osgeo import gdal
 import matplotlib.pyplot as plt
+import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Features"))
+from lulc_catalog import LulcCatalog
+
 
 def display_pct_raster(raster_path):
     try:
@@ -25,7 +29,7 @@ def display_pct_raster(raster_path):
         # Extract raster data as array
         raster_data = band.ReadAsArray()
         print("Raster Data Type:", raster_data.dtype)
-        print("Unique Values in Raster:", np.unique(raster_data))
+        print("Unique Values in Raster:", LulcCatalog.open(raster_path, id_band=1).ids)
         
         # Handle potential NoData values
         nodata_value = band.GetNoDataValue()
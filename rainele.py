@@ -1,3 +1,5 @@
+import os
+import sys
 import tifffile as tiff
 import numpy as np
 import matplotlib.pyplot as plt
@@ -5,6 +7,9 @@ from scipy.ndimage import gaussian_filter
 import rasterio
 from matplotlib.colors import ListedColormap
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Features"))
+from classify import classify
+
 # Load the DEM image
 image_path = 'data/puneDem.tif'
 dem_data = tiff.imread(image_path).astype(float)
@@ -25,30 +30,21 @@ def classify_flood_risk(interpolated_rainfall_file):
     # Set negative rainfall values to zero
     rainfall_data[rainfall_data < 0] = 0
 
-    # Define flood risk zones based on combinations of elevation and rainfall
-    flood_risk = np.full(rainfall_data.shape, np.nan, dtype=np.float32)
-
-    # Define conditions for each flood risk level (all 12 combinations)
-    # Low Elevation (< 570)
-    flood_risk[(smoothed_data < 570) & (rainfall_data < 10)] = 0  # No Risk
-    flood_risk[(smoothed_data < 570) & (10 <= rainfall_data) & (rainfall_data < 20)] = 1  # Low Risk
-    flood_risk[(smoothed_data < 570) & (20 <= rainfall_data) & (rainfall_data < 24)] = 2  # Medium Risk
-    flood_risk[(smoothed_data < 570) & (rainfall_data >= 24)] = 3  # High Risk
-
-    # Medium Elevation (570–700)
-    flood_risk[(570 <= smoothed_data) & (smoothed_data < 700) & (rainfall_data < 10)] = 0  # No Risk
-    flood_risk[(570 <= smoothed_data) & (smoothed_data < 700) & (10 <= rainfall_data) & (rainfall_data < 20)] = 1  # Low Risk
-    flood_risk[(570 <= smoothed_data) & (smoothed_data < 700) & (20 <= rainfall_data) & (rainfall_data < 24)] = 2  # Medium Risk
-    flood_risk[(570 <= smoothed_data) & (smoothed_data < 700) & (rainfall_data >= 24)] = 3  # High Risk
-
-    # High Elevation (≥ 700)
-    flood_risk[(smoothed_data >= 700) & (rainfall_data < 10)] = 0  # No Risk
-    flood_risk[(smoothed_data >= 700) & (10 <= rainfall_data) & (rainfall_data < 20)] = 1  # Low Risk
-    flood_risk[(smoothed_data >= 700) & (20 <= rainfall_data) & (rainfall_data < 24)] = 1  # Low Risk
-    flood_risk[(smoothed_data >= 700) & (rainfall_data >= 24)] = 2  # Medium Risk
-
-    # Handle invalid data (NaN in DEM or negative rainfall)
-    flood_risk[np.isnan(smoothed_data) | (rainfall_data < 0)] = np.nan
+    # Flood risk for every combination of elevation class (rows: < 570, 570-700, >= 700)
+    # and rainfall class (columns: < 10, 10-20, 20-24, >= 24).
+    # 0 = No Risk, 1 = Low, 2 = Medium, 3 = High; the last row and column are No Data.
+    risk_table = np.array([
+        [0, 1, 2, 3, np.nan],  # Low Elevation (< 570)
+        [0, 1, 2, 3, np.nan],  # Medium Elevation (570-700)
+        [0, 1, 1, 2, np.nan],  # High Elevation (>= 700)
+        [np.nan] * 5,          # No elevation data
+    ], dtype=np.float32)
+
+    elevation_class = classify(smoothed_data, [570, 700], [0, 1, 2], nodata_code=3)
+    rainfall_class = classify(rainfall_data, [10, 20, 24], [0, 1, 2, 3], nodata_code=4)
+
+    # Invalid data (NaN in DEM or rainfall) falls on the No Data row/column
+    flood_risk = risk_table[elevation_class, rainfall_class]
 
     return flood_risk
 
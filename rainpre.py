@@ -1,8 +1,13 @@
+import os
+import sys
 import rasterio
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Features"))
+from classify import classify
+
 def predict_flood_risk_with_nan(interpolated_rainfall_file, low_risk_threshold, medium_risk_threshold, high_risk_threshold):
     # Open the interpolated rainfall file (GeoTIFF)
     with rasterio.open(interpolated_rainfall_file) as src:
@@ -15,12 +20,10 @@ def predict_flood_risk_with_nan(interpolated_rainfall_file, low_risk_threshold,
     # # Identify and set NaN values
     rainfall_data[rainfall_data == -1] = np.nan  # Assuming 0 is considered invalid/NaN
 
-    # Define flood risk levels based on thresholds
-    flood_risk = np.zeros(rainfall_data.shape, dtype=np.uint8)
-    flood_risk[rainfall_data >= high_risk_threshold] = 3  # High risk
-    flood_risk[(rainfall_data >= medium_risk_threshold) & (rainfall_data < high_risk_threshold)] = 2  # Medium risk
-    flood_risk[(rainfall_data >= low_risk_threshold) & (rainfall_data < medium_risk_threshold)] = 1  # Low risk
-    flood_risk[np.isnan(rainfall_data)] = 4  # Set NaN values as 4 for custom coloring
+    # Define flood risk levels based on thresholds: below the low threshold stays 0,
+    # then low, medium and high risk; NaN values become 4 for custom coloring
+    flood_risk = classify(rainfall_data, [low_risk_threshold, medium_risk_threshold, high_risk_threshold],
+                          [0, 1, 2, 3], nodata_code=4)
 
     # Define colors with NaN (category 4) as gray
     cmap = ListedColormap([ 'yellow', 'orange', 'red', 'gray'])
@@ -1,25 +1,25 @@
+import os
+import sys
 import numpy as np
 import rasterio
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
-from scipy.ndimage import gaussian_filter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Features"))
+from risk_model import compute_terrain
+from terrain import is_geographic
+
+# "gradient" (unit pixel spacing) or "horn" (true pixel sizes in metres)
+SLOPE_METHOD = "gradient"
 
 # 1. Load the DEM
 dem_file_path = 'data/puneDem.tif'
 with rasterio.open(dem_file_path) as dem:
     dem_data = dem.read(1).astype(float)  # Convert to float for NaN handling
+    dem_transform, dem_geographic = dem.transform, is_geographic(dem)
 
-# 2. Mask for negative values in the DEM
-negative_mask = dem_data < 0
-dem_data[negative_mask] = np.nan
-
-# Optional: Apply Gaussian filter for smoothing
-smoothed_data = gaussian_filter(dem_data, sigma=1)
-
-# 3. Calculate the Slope
-x_gradient, y_gradient = np.gradient(smoothed_data)
-slope = np.arctan(np.sqrt(x_gradient**2 + y_gradient**2)) * (180 / np.pi)
-slope[negative_mask] = np.nan
+# 2-3. Mask negative values, smooth and calculate the slope
+smoothed_data, slope = compute_terrain(dem_data, SLOPE_METHOD, dem_transform, dem_geographic)
 
 # 4. Define slope risk categories
 def classify_slope(slope_data):